@@ -0,0 +1,39 @@
+import re
+
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+
+try:
+    import brotli
+except ImportError:  # brotli - необязательная зависимость
+    brotli = None
+
+accepts_brotli = re.compile(r"\bbr\b").search
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """brotli, если пакет установлен и клиент его принимает, иначе gzip."""
+
+    def process_response(self, request, response):
+        if (brotli is None or response.streaming
+                or len(response.content) < 200
+                or response.has_header("Content-Encoding")
+                or not accepts_brotli(
+                    request.META.get("HTTP_ACCEPT_ENCODING", "")
+                )):
+            return super().process_response(request, response)
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed = brotli.compress(response.content)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
+
+
+compress = decorator_from_middleware(CompressionMiddleware)
@@ -0,0 +1,164 @@
+import gzip
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+            for i in range(15)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def get_json(self, url, client=None, **extra):
+        response = (client or self.guest).get(url, extra)
+        return response, json.loads(response.content)
+
+    def test_posts_cursor_pagination(self):
+        url = reverse('api:posts')
+        response, first = self.get_json(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(first['results']), 10)
+        self.assertIsNone(first['previous'])
+        self.assertEqual(first['results'][0]['text'], 'Пост 14')
+        self.assertEqual(first['results'][0]['author'], 'Author')
+        self.assertEqual(first['results'][0]['group'], 'test-slug')
+        _, second = self.get_json(url, after=first['next'])
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['results'][-1]['text'], 'Пост 0')
+
+    def test_sparse_fields_and_limit(self):
+        _, data = self.get_json(
+            reverse('api:posts'), fields='id,text', limit='3'
+        )
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+
+    def test_unknown_field_is_bad_request(self):
+        response, data = self.get_json(reverse('api:posts'), fields='email')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('email', data['detail'])
+
+    def test_detail_comments_group_and_profile(self):
+        post = ApiTests.posts[0]
+        _, data = self.get_json(
+            reverse('api:post', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(data['id'], post.pk)
+        self.assertIsNone(data['image'])
+        _, data = self.get_json(
+            reverse('api:comments', kwargs={'post_id': post.pk})
+        )
+        self.assertEqual(data['results'][0]['author'], 'Reader')
+        _, data = self.get_json(
+            reverse('api:group_posts', kwargs={'slug': 'test-slug'}),
+            limit='100'
+        )
+        self.assertEqual(len(data['results']), 15)
+        _, data = self.get_json(
+            reverse('api:profile', kwargs={'username': 'Author'})
+        )
+        self.assertEqual(data['posts_count'], 15)
+        self.assertEqual(data['followers_count'], 1)
+
+    def test_missing_objects_are_json_404(self):
+        urls = [
+            reverse('api:post', kwargs={'post_id': 999}),
+            reverse('api:comments', kwargs={'post_id': 999}),
+            reverse('api:group_posts', kwargs={'slug': 'none'}),
+            reverse('api:profile', kwargs={'username': 'none'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response, data = self.get_json(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', data)
+
+    def test_follow_feed(self):
+        response, _ = self.get_json(reverse('api:follow'))
+        self.assertEqual(response.status_code, 401)
+        client = Client()
+        client.force_login(ApiTests.reader)
+        _, data = self.get_json(reverse('api:follow'), client)
+        self.assertEqual(len(data['results']), 10)
+        _, data = self.get_json(
+            reverse('api:follow'), client, after=data['next']
+        )
+        self.assertEqual(len(data['results']), 5)
+
+    def test_gzip_and_conditional_get(self):
+        url = reverse('api:posts')
+        response = self.guest.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 10)
+        response = self.guest.get(
+            url, HTTP_ACCEPT_ENCODING='gzip',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_list_query_count(self):
+        with self.assertNumQueries(1):
+            self.guest.get(reverse('api:posts'))
+
+    def test_bulk_import_is_staff_only(self):
+        body = '\n'.join(json.dumps(row) for row in (
+            {'ref': 'x', 'text': 'Импорт', 'author': 'Author'},
+            {'type': 'comment', 'post': 'x', 'text': 'Ок', 'author': 'Reader'},
+        ))
+        url = reverse('api:import')
+        client = Client()
+        client.force_login(ApiTests.reader)
+        response = client.post(
+            url, body, content_type='application/x-ndjson'
+        )
+        self.assertEqual(response.status_code, 403)
+        staff = User.objects.create_user(username='Staff', is_staff=True)
+        client.force_login(staff)
+        response = client.post(
+            url, body, content_type='application/x-ndjson'
+        )
+        data = json.loads(response.content)
+        self.assertEqual((data['posts'], data['comments']), (1, 1))
+        self.assertTrue(Post.objects.filter(text='Импорт').exists())
+
+    def test_export_is_streamed(self):
+        response = self.guest.get(reverse('api:export'))
+        self.assertEqual(response.status_code, 401)
+        client = Client()
+        client.force_login(ApiTests.author)
+        response = client.get(reverse('api:export'))
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment', response['Content-Disposition'])
+        rows = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(rows), 1 + 15 + 1)
+        self.assertEqual(
+            client.get(reverse('api:export'), {'all': 1}).status_code, 403
+        )
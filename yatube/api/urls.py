@@ -0,0 +1,19 @@
+from django.urls import path
+
+from . import views
+
+app_name = "api"
+
+urlpatterns = [
+    path("posts/", views.posts, name="posts"),
+    path("posts/<int:post_id>/", views.post_detail, name="post"),
+    path("posts/<int:post_id>/comments/", views.comments, name="comments"),
+    path("groups/", views.groups, name="groups"),
+    path("groups/<slug:slug>/posts/", views.group_posts, name="group_posts"),
+    path("profiles/<str:username>/", views.profile, name="profile"),
+    path("profiles/<str:username>/posts/",
+         views.profile_posts, name="profile_posts"),
+    path("follow/", views.follow, name="follow"),
+    path("import/", views.bulk_import, name="import"),
+    path("export/", views.export, name="export"),
+]
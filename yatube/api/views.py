@@ -0,0 +1,297 @@
+from functools import wraps
+
+from django.conf import settings
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from posts import (caching, exporter, follows, importer, stats,
+                   timeline)
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator, encode_cursor
+from posts.views import (POSTS_ON_PAGE, feed_keys, follow_keys, get_page,
+                         profile_keys)
+
+from .compression import compress
+
+MAX_LIMIT = 100
+
+# Поле ответа -> путь для values(). Объекты моделей не создаются:
+# строки приходят словарями и только переименовываются
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "created": "created",
+    "author": "author__username",
+}
+GROUP_FIELDS = {
+    "slug": "slug",
+    "title": "title",
+    "description": "description",
+}
+image_storage = Post._meta.get_field("image").storage
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def render(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False,
+        json_dumps_params={"ensure_ascii": False, "separators": (",", ":")}
+    )
+
+
+def api_view(keys_func=None):
+    """Сжатие, условный GET и ошибки в JSON для представлений API."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return render({"detail": str(error)}, error.status)
+            except Http404:
+                return render({"detail": "Не найдено"}, 404)
+        if keys_func is not None:
+            wrapper = caching.conditional(keys_func)(wrapper)
+        return compress(wrapper)
+    return decorator
+
+
+def requested_fields(request, available, required=()):
+    """Поля из ?fields=a,b и пути values() для них и для ключей."""
+    names = list(available)
+    if request.GET.get("fields"):
+        names = [name for name in request.GET["fields"].split(",") if name]
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ApiError(f"Неизвестные поля: {', '.join(unknown)}")
+    lookups = {available[name] for name in names} | set(required)
+    return names, sorted(lookups)
+
+
+def serialize(rows, names, available):
+    results = []
+    for row in rows:
+        item = {name: row[available[name]] for name in names}
+        if "image" in item:
+            item["image"] = (
+                image_storage.url(item["image"]) if item["image"] else None
+            )
+        results.append(item)
+    return results
+
+
+def page_limit(request):
+    try:
+        limit = int(request.GET.get("limit", POSTS_ON_PAGE))
+    except ValueError:
+        raise ApiError("limit должен быть числом")
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def page_response(page, names, available, *keys):
+    response = render({
+        "results": serialize(page, names, available),
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+    return caching.add_surrogate_keys(response, *keys, *row_keys(page))
+
+
+def row_keys(rows):
+    keys = []
+    for row in rows:
+        keys.append(f"post-{row['id']}")
+        if row.get("group_id") is not None:
+            keys.append(f"group-{row['group_id']}")
+    return keys
+
+
+def post_page(request, queryset, *keys):
+    names, lookups = requested_fields(
+        request, POST_FIELDS, ("id", "pub_date", "group_id")
+    )
+    paginator = CursorPaginator(
+        queryset.values(*lookups), page_limit(request),
+        keys=("pub_date", "id")
+    )
+    return page_response(get_page(request, paginator), names, POST_FIELDS,
+                         *keys)
+
+
+def api_post_keys(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).order_by().values_list(
+        "author_id", flat=True
+    ).first()
+    return author_id and [f"post-{post_id}", f"author-{author_id}"]
+
+
+@api_view(feed_keys)
+def posts(request):
+    return post_page(request, Post.objects.all(), caching.FEED)
+
+
+@api_view(api_post_keys)
+def post_detail(request, post_id):
+    names, lookups = requested_fields(request, POST_FIELDS, ("author_id",))
+    row = Post.objects.filter(pk=post_id).values(*lookups).first()
+    if row is None:
+        raise Http404
+    response = render(serialize([row], names, POST_FIELDS)[0])
+    return caching.add_surrogate_keys(
+        response, f"post-{post_id}", f"author-{row['author_id']}"
+    )
+
+
+@api_view(api_post_keys)
+def comments(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    names, lookups = requested_fields(
+        request, COMMENT_FIELDS, ("id", "created")
+    )
+    paginator = CursorPaginator(
+        Comment.objects.filter(post=post_id).values(*lookups),
+        page_limit(request), keys=("created", "id")
+    )
+    page = get_page(request, paginator)
+    response = render({
+        "results": serialize(page, names, COMMENT_FIELDS),
+        "next": page.next_cursor,
+        "previous": page.previous_cursor,
+    })
+    return caching.add_surrogate_keys(response, f"post-{post_id}")
+
+
+@api_view(feed_keys)
+def groups(request):
+    names, lookups = requested_fields(request, GROUP_FIELDS, ("id",))
+    rows = Group.objects.order_by("title").values(*lookups)
+    response = render({"results": serialize(rows, names, GROUP_FIELDS)})
+    return caching.add_surrogate_keys(
+        response, *(f"group-{row['id']}" for row in rows)
+    )
+
+
+@api_view(feed_keys)
+def group_posts(request, slug):
+    group_id = get_object_or_404(
+        Group.objects.values_list("pk", flat=True), slug=slug
+    )
+    return post_page(
+        request, Post.objects.filter(group=group_id), f"group-{group_id}"
+    )
+
+
+@api_view(profile_keys)
+def profile(request, username):
+    user = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    user_stats = follows.with_pending(stats.get_stats(user), request.user)
+    response = render({
+        "username": user.username,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "posts_count": user_stats.posts_count,
+        "followers_count": user_stats.followers_count,
+        "follows_count": user_stats.follows_count,
+    })
+    return caching.add_surrogate_keys(response, f"author-{user.pk}")
+
+
+@api_view(profile_keys)
+def profile_posts(request, username):
+    author_id = get_object_or_404(
+        User.objects.values_list("pk", flat=True), username=username
+    )
+    return post_page(
+        request, Post.objects.filter(author=author_id), f"author-{author_id}"
+    )
+
+
+class TimelineRows(timeline.TimelinePaginator):
+    """Лента подписок словарями из values() вместо объектов Post."""
+
+    def __init__(self, user, per_page, lookups):
+        super().__init__(user, per_page)
+        self.lookups = lookups
+
+    def in_bulk(self, pks):
+        rows = Post.objects.filter(pk__in=pks).values(*self.lookups)
+        return {row["id"]: row for row in rows}
+
+    def cursor_for(self, row):
+        return encode_cursor(row["pub_date"], row["id"])
+
+
+@api_view(follow_keys)
+def follow(request):
+    if not request.user.is_authenticated:
+        raise ApiError("Нужно войти", status=401)
+    follows.flush(request.user.pk)
+    names, lookups = requested_fields(
+        request, POST_FIELDS, ("id", "pub_date", "group_id")
+    )
+    paginator = TimelineRows(request.user, page_limit(request), lookups)
+    return page_response(get_page(request, paginator), names, POST_FIELDS)
+
+
+@require_POST
+@api_view()
+def bulk_import(request):
+    """Импорт NDJSON или CSV (Content-Type: text/csv) из тела запроса.
+
+    Тело читается потоком, без загрузки в память целиком.
+    """
+    if not request.user.is_staff:
+        raise ApiError("Доступно только персоналу", status=403)
+    fmt = "csv" if request.content_type == "text/csv" else "ndjson"
+    default_type = request.GET.get("type", "post")
+    if default_type not in importer.TYPES:
+        raise ApiError(f"Неизвестный тип «{default_type}»")
+    run = importer.Importer(
+        default_type=default_type,
+        image_hosts=settings.IMPORT_IMAGE_HOSTS
+    )
+    summary = run.run(
+        importer.read_rows(importer.decode_lines(request), fmt)
+    )
+    summary["error_lines"] = [
+        {"line": line, "detail": message}
+        for line, message in run.errors[:MAX_LIMIT]
+    ]
+    return render(summary)
+
+
+@api_view()
+def export(request):
+    """Выгрузка данных пользователя в NDJSON; ?all=1 - весь сайт.
+
+    Ответ отдаётся потоком кусками по CHUNK_SIZE строк.
+    """
+    if not request.user.is_authenticated:
+        raise ApiError("Нужно войти", status=401)
+    user, filename = request.user, f"yatube-{request.user.username}.ndjson"
+    if request.GET.get("all"):
+        if not request.user.is_staff:
+            raise ApiError("Доступно только персоналу", status=403)
+        user, filename = None, "yatube.ndjson"
+    response = StreamingHttpResponse(
+        exporter.ndjson(user), content_type="application/x-ndjson"
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
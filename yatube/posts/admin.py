@@ -1,6 +1,8 @@
 from django.contrib import admin
 
+from .forms import PostAdminForm
 from .models import Comment, Follow, Group, Post
+from .search import filter_matching
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -9,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ("text",)
     list_filter = ("pub_date",)
     empty_value_display = "-пусто-"
+    form = PostAdminForm
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return filter_matching(queryset, search_term), False
 
 
 admin.site.register(Post, PostAdmin)
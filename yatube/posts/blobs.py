@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.db.models import F
+
+from . import images, tasks, thumbnails
+from .models import ImageBlob
+
+
+def acquire(name, refs=1):
+    """Ещё refs постов ссылаются на файл name."""
+    if not name:
+        return
+    _, created = ImageBlob.objects.get_or_create(
+        name=name, defaults={"refs": refs}
+    )
+    if not created:
+        ImageBlob.objects.filter(name=name).update(refs=F("refs") + refs)
+
+
+def release(name):
+    """Пост перестал ссылаться на name; последняя ссылка удаляет файлы.
+
+    Файл, миниатюры и варианты удаляются фоновой задачей после
+    коммита, чтобы откат транзакции не оставил пост без картинки.
+    """
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name).update(refs=F("refs") - 1)
+    deleted, _ = ImageBlob.objects.filter(name=name, refs__lte=0).delete()
+    if deleted:
+        transaction.on_commit(
+            lambda: tasks.submit(f"blobs:{name}", remove_files, name)
+        )
+
+
+def remove_files(name):
+    if ImageBlob.objects.filter(name=name).exists():
+        return
+    thumbnails.delete(name)
+    images.delete_variants(name)
@@ -0,0 +1,140 @@
+import hashlib
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.http import condition
+
+VERSION_KEY = "posts:surrogate:{}"
+FEED = "feed"
+
+
+def now_ms():
+    return int(time.time() * 1000)
+
+
+def isolated_caches(name):
+    """CACHES с новым пустым LocMem-кэшем вместо кэша сайта.
+
+    Для бенчмарков через override_settings: их прогоны не читают и не
+    стирают кэш, которым пользуется работающий сайт.
+    """
+    return {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": f"{name}-{uuid.uuid4().hex}",
+        }
+    }
+
+
+def get_versions(keys):
+    """Текущие версии суррогатных ключей.
+
+    Версия - время последнего изменения в миллисекундах. Версия
+    пропавшего из кэша ключа начинается с текущего времени, чтобы
+    не совпасть с версией, под которой сохранены старые записи.
+    Версии живут SURROGATE_KEY_TIMEOUT секунд.
+    """
+    names = {VERSION_KEY.format(key): key for key in keys}
+    found = cache.get_many(names)
+    for name in names.keys() - found.keys():
+        cache.add(name, now_ms(), settings.SURROGATE_KEY_TIMEOUT)
+        found[name] = cache.get(name)
+    return {names[name]: version for name, version in found.items()}
+
+
+def purge(*keys):
+    names = [VERSION_KEY.format(key) for key in set(keys)]
+    versions = cache.get_many(names)
+    cache.set_many({
+        name: max(now_ms(), versions.get(name, 0) + 1) for name in names
+    }, settings.SURROGATE_KEY_TIMEOUT)
+
+
+def feed_generation():
+    """Номер поколения ленты: меняется при любой записи в Post.
+
+    Входит в ключ кэша фрагментов, поэтому после изменения поста
+    старые фрагменты просто перестают читаться и вытесняются по TTL.
+    """
+    return get_versions([FEED])[FEED]
+
+
+def post_keys(post):
+    keys = [FEED, f"post-{post.pk}", f"author-{post.author_id}"]
+    if post.group_id is not None:
+        keys.append(f"group-{post.group_id}")
+    return keys
+
+
+def purge_posts(posts):
+    """Сбрасывает кэш страниц и лент, где показаны posts."""
+    keys = []
+    for post in posts:
+        keys.extend(post_keys(post))
+    if keys:
+        purge(*keys)
+
+
+def page_keys(posts):
+    keys = []
+    for post in posts:
+        keys.append(f"post-{post.pk}")
+        if post.group_id is not None:
+            keys.append(f"group-{post.group_id}")
+    return keys
+
+
+def add_surrogate_keys(response, *keys):
+    response["Surrogate-Key"] = " ".join(dict.fromkeys(keys))
+    return response
+
+
+def conditional(keys_func):
+    """Условный GET без рендеринга шаблона.
+
+    keys_func(request, *args, **kwargs) возвращает суррогатные ключи
+    страницы или None, если объекта нет. ETag строится из версий ключей,
+    пути и пользователя, Last-Modified - из самой свежей версии; его
+    отдаём только анонимам, потому что он не различает пользователей.
+    """
+    def get_validators(request, *args, **kwargs):
+        if not hasattr(request, "validators"):
+            keys = keys_func(request, *args, **kwargs)
+            request.validators = None
+            if keys is not None:
+                versions = get_versions(keys)
+                raw = (
+                    f"{request.user.pk}|{request.get_full_path()}|"
+                    f"{sorted(versions.items())}"
+                )
+                request.validators = (
+                    hashlib.md5(raw.encode()).hexdigest(),
+                    datetime.fromtimestamp(
+                        max(versions.values()) / 1000, timezone.utc
+                    )
+                )
+        return request.validators
+
+    def etag_func(request, *args, **kwargs):
+        validators = get_validators(request, *args, **kwargs)
+        return validators and validators[0]
+
+    def last_modified_func(request, *args, **kwargs):
+        validators = get_validators(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            return None
+        return validators and validators[1]
+
+    return condition(etag_func, last_modified_func)
+
+
+def page_key(request):
+    """Ключ кэша страницы; ответ API бывает сжат под Accept-Encoding."""
+    raw = (
+        f"{request.get_full_path()}|"
+        f"{request.META.get('HTTP_ACCEPT_ENCODING', '')}"
+    )
+    return "posts:page:" + hashlib.md5(raw.encode()).hexdigest()
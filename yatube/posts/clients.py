@@ -0,0 +1,42 @@
+import ipaddress
+from functools import lru_cache
+
+from django.conf import settings
+
+
+@lru_cache(maxsize=None)
+def networks(proxies):
+    return [ipaddress.ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def is_trusted(address):
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in network
+        for network in networks(tuple(settings.TRUSTED_PROXIES))
+    )
+
+
+def client_ip(request):
+    """Адрес клиента: REMOTE_ADDR или, за доверенным прокси, из XFF.
+
+    X-Forwarded-For разбирается справа налево: каждый доверенный
+    прокси дописывает в конец адрес того, от кого получил запрос.
+    Клиент - первый адрес не из TRUSTED_PROXIES; всё левее него
+    мог подставить сам клиент.
+    """
+    address = request.META.get("REMOTE_ADDR", "")
+    if not is_trusted(address):
+        return address
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    for hop in reversed(forwarded.split(",")):
+        hop = hop.strip()
+        if not hop:
+            continue
+        address = hop
+        if not is_trusted(hop):
+            break
+    return address
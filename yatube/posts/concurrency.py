@@ -0,0 +1,63 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from . import metrics, routers
+
+lock = threading.Lock()
+executor = None
+
+
+def pool():
+    global executor
+    with lock:
+        if executor is None:
+            executor = ThreadPoolExecutor(
+                settings.QUERY_WORKERS, thread_name_prefix="posts-queries"
+            )
+        return executor
+
+
+def parallel_allowed():
+    """Можно ли читать из других соединений, не теряя согласованности.
+
+    Незакоммиченную транзакцию другое соединение не видит.
+    """
+    if settings.QUERY_WORKERS <= 1:
+        return False
+    for connection in connections.all():
+        if connection.in_atomic_block:
+            return False
+    return True
+
+
+def gather(*funcs):
+    """Результаты funcs() по порядку; независимые чтения идут параллельно.
+
+    Первая функция выполняется в текущем потоке, остальные - в пуле
+    из QUERY_WORKERS потоков, каждый со своим соединением с базой.
+    Потоки пула наследуют закрепление за основной базой и замеры
+    запроса для /metrics. Только для чтения: запись в потоке пула не
+    закрепит за основной базой сам запрос.
+    """
+    if len(funcs) < 2 or not parallel_allowed():
+        return [func() for func in funcs]
+    context = (routers.is_pinned(), metrics.timings())
+    futures = [pool().submit(call, func, context) for func in funcs[1:]]
+    first = funcs[0]()
+    return [first] + [future.result() for future in futures]
+
+
+def call(func, context):
+    pinned, recorder = context
+    if pinned:
+        routers.pin()
+    try:
+        with metrics.recording(recorder):
+            return func()
+    finally:
+        routers.reset()
+        # Как после запроса: соединение старше CONN_MAX_AGE закрывается
+        close_old_connections()
@@ -0,0 +1,171 @@
+import csv
+import os
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+
+from . import routers
+from .models import Comment, Follow, Post, User
+from .storage import content_addressed_storage
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pyarrow - необязательная зависимость
+    pyarrow = None
+
+CHUNK_SIZE = 2000
+FORMATS = ("ndjson", "csv", "parquet")
+
+USER_FIELDS = ["id", "username", "first_name", "last_name", "date_joined"]
+# В выгрузку пользователя для него самого попадают и личные поля
+PERSONAL_FIELDS = USER_FIELDS + ["email", "last_login"]
+
+encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def tables(user=None, using=routers.PRIMARY):
+    """Таблицы выгрузки из базы using: имя -> queryset values().
+
+    user=None - весь сайт, иначе только данные пользователя: его
+    профиль, посты, комментарии, подписки в обе стороны и картинки.
+    Каждая таблица отсортирована по первичному ключу, чтобы
+    iterator() читал её кусками в стабильном порядке.
+    """
+    users = User.objects.using(using).values(*USER_FIELDS)
+    posts = Post.objects.using(using)
+    comments = Comment.objects.using(using)
+    follows = Follow.objects.using(using)
+    if user is not None:
+        users = User.objects.using(using).filter(pk=user.pk).values(
+            *PERSONAL_FIELDS
+        )
+        posts = posts.filter(author=user)
+        comments = comments.filter(author=user)
+        follows = follows.filter(Q(user=user) | Q(author=user))
+    return {
+        "user": users.order_by("pk"),
+        "post": posts.order_by("pk").values(
+            "id", "author_id", "group_id", "text", "pub_date", "image"
+        ),
+        "comment": comments.order_by("pk").values(
+            "id", "post_id", "author_id", "text", "created"
+        ),
+        "follow": follows.order_by("pk").values("id", "user_id", "author_id"),
+        "image": posts.exclude(image="").exclude(image__isnull=True).order_by(
+            "pk"
+        ).values("id", "image"),
+    }
+
+
+def post_row(row):
+    row["image"] = row["image"] or None
+    return row
+
+
+def image_row(row):
+    return {
+        "post_id": row["id"], "name": row["image"],
+        "url": content_addressed_storage.url(row["image"]),
+    }
+
+
+CONVERTERS = {"post": post_row, "image": image_row}
+
+
+def rows(name, queryset, chunk_size=CHUNK_SIZE):
+    convert = CONVERTERS.get(name)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield convert(row) if convert else row
+
+
+def ndjson(user=None, chunk_size=CHUNK_SIZE, using=routers.PRIMARY):
+    """Выгрузка одним потоком NDJSON, кусками по chunk_size строк.
+
+    Все таблицы читаются из базы using в одной транзакции, то есть из
+    одного снимка. Роутер реплик не участвует: иначе таблицы читались
+    бы из разных баз мимо транзакции. Память не зависит от размера
+    таблиц.
+    """
+    with transaction.atomic(using=using):
+        for name, queryset in tables(user, using).items():
+            lines = []
+            for row in rows(name, queryset, chunk_size):
+                lines.append(encoder.encode({"type": name, **row}) + "\n")
+                if len(lines) == chunk_size:
+                    yield "".join(lines).encode()
+                    lines = []
+            if lines:
+                yield "".join(lines).encode()
+
+
+def write_files(directory, fmt, user=None, chunk_size=CHUNK_SIZE,
+                using=routers.PRIMARY):
+    """По файлу на таблицу в directory; возвращает {имя: строк}.
+
+    Снимок базы using, как у ndjson().
+    """
+    if fmt == "parquet" and pyarrow is None:
+        raise RuntimeError("Для parquet нужен пакет pyarrow")
+    written = {}
+    with transaction.atomic(using=using):
+        for name, queryset in tables(user, using).items():
+            path = os.path.join(directory, f"{name}.{fmt}")
+            source = rows(name, queryset, chunk_size)
+            if fmt == "parquet":
+                written[name] = write_parquet(path, source, chunk_size)
+            else:
+                with open(path, "w", encoding="utf-8", newline="") as file:
+                    write = write_csv if fmt == "csv" else write_ndjson
+                    written[name] = write(file, source)
+    return written
+
+
+def write_ndjson(file, source):
+    count = 0
+    for count, row in enumerate(source, 1):
+        file.write(encoder.encode(row) + "\n")
+    return count
+
+
+def write_csv(file, source):
+    writer = csv.writer(file)
+    count = 0
+    for count, row in enumerate(source, 1):
+        if count == 1:
+            writer.writerow(list(row))
+        writer.writerow([
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in row.values()
+        ])
+    return count
+
+
+def write_parquet(path, source, chunk_size):
+    """Группа строк Parquet на каждый кусок из chunk_size строк."""
+    writer = None
+    count = 0
+    chunk = []
+    try:
+        for row in source:
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                writer = write_chunk(writer, path, chunk)
+                count += len(chunk)
+                chunk = []
+        if chunk:
+            writer = write_chunk(writer, path, chunk)
+            count += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+
+def write_chunk(writer, path, chunk):
+    table = pyarrow.Table.from_pylist(chunk)
+    if writer is None:
+        writer = pyarrow.parquet.ParquetWriter(path, table.schema)
+    writer.write_table(table.cast(writer.schema))
+    return writer
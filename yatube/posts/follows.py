@@ -0,0 +1,216 @@
+import atexit
+import copy
+import logging
+import threading
+
+from django.conf import settings
+from django.db import (DatabaseError, IntegrityError, close_old_connections,
+                       transaction)
+
+from . import caching, routers
+from .models import Follow, User
+
+logger = logging.getLogger(__name__)
+
+lock = threading.Lock()
+# Держится на время записи буфера в базу
+writing = threading.Lock()
+# (user_id, author_id) -> (было в базе, должно стать)
+pending = {}
+# (user_id, author_id) -> сколько раз подряд запись не удалась
+attempts = {}
+timer = None
+
+# После стольких неудач подряд изменение пары отбрасывается
+FLUSH_ATTEMPTS = 5
+
+
+def change(user_id, author_id, following):
+    """Подписывает или отписывает user_id от author_id с отложенной записью.
+
+    Изменения копятся в памяти процесса и пишутся одной транзакцией
+    раз в FOLLOW_FLUSH_MS миллисекунд. Повторные переключения одной
+    пары схлопываются: в базу попадает только итоговое состояние, а
+    вернувшаяся к исходному пара не пишется вовсе. При
+    FOLLOW_FLUSH_MS = 0 запись сразу.
+    """
+    key = (user_id, author_id)
+    with lock:
+        state = pending.get(key)
+        if state is not None:
+            pending[key] = (state[0], following)
+    if state is None:
+        # Исходное состояние читается, пока не идёт запись буфера:
+        # иначе можно прочитать то, что она сейчас перепишет
+        with writing:
+            exists = Follow.objects.filter(
+                user=user_id, author=author_id
+            ).exists()
+            with lock:
+                state = pending.get(key, (exists, None))
+                pending[key] = (state[0], following)
+    # Свои страницы клиент должен сразу увидеть с новым состоянием
+    caching.purge(f"author-{author_id}", f"author-{user_id}")
+    routers.record_write()
+    if settings.FOLLOW_FLUSH_MS:
+        schedule()
+    else:
+        flush()
+
+
+def schedule():
+    global timer
+    with lock:
+        if timer is None:
+            timer = threading.Timer(
+                settings.FOLLOW_FLUSH_MS / 1000, flush_in_background
+            )
+            timer.daemon = True
+            timer.start()
+
+
+def flush_in_background():
+    global timer
+    with lock:
+        timer = None
+    try:
+        with routers.use_primary():
+            flush()
+    finally:
+        close_old_connections()
+
+
+def take(user_id=None):
+    with lock:
+        keys = [
+            key for key in pending if user_id is None or key[0] == user_id
+        ]
+        return {key: pending.pop(key) for key in keys}
+
+
+def flush(user_id=None):
+    """Пишет накопленное (только для user_id, если задан) через write().
+
+    Запись идёт через ORM, поэтому сигналы Follow обновляют счётчики,
+    ленты и кэш как обычно.
+    """
+    with writing:
+        changes = {
+            key: state for key, state in take(user_id).items()
+            if state[0] != state[1]
+        }
+        if changes:
+            write(changes)
+
+
+def write(changes):
+    """Пишет изменения одной транзакцией, каждую пару в своей точке сохранения.
+
+    Пара, которую база отвергает (автор или подписчик уже удалён),
+    отбрасывается и не мешает остальным. Прочие ошибки возвращают
+    пару в буфер, но не больше FLUSH_ATTEMPTS раз подряд.
+    """
+    users = set(User.objects.filter(
+        pk__in={user for key in changes for user in key}
+    ).values_list("pk", flat=True))
+    failed = {}
+    try:
+        with transaction.atomic():
+            for key, (_, following) in changes.items():
+                if following and not users.issuperset(key):
+                    logger.warning("Подписка %s на удалённого пользователя "
+                                   "отброшена", key)
+                    continue
+                try:
+                    with transaction.atomic():
+                        apply(key, following)
+                except IntegrityError:
+                    logger.exception("Подписка %s отброшена", key)
+                except DatabaseError:
+                    failed[key] = changes[key]
+    except DatabaseError:
+        logger.exception("Не удалось записать %d подписок", len(changes))
+        failed = changes
+    with lock:
+        for key in changes.keys() - failed.keys():
+            attempts.pop(key, None)
+    if failed:
+        retry(failed)
+
+
+def apply(key, following):
+    follower, author = key
+    if following:
+        Follow.objects.get_or_create(user_id=follower, author_id=author)
+    else:
+        Follow.objects.filter(user=follower, author=author).delete()
+
+
+def retry(failed):
+    with lock:
+        for key, state in failed.items():
+            attempts[key] = attempts.get(key, 0) + 1
+            if attempts[key] >= FLUSH_ATTEMPTS:
+                del attempts[key]
+                logger.error("Подписка %s не записана за %d попыток",
+                             key, FLUSH_ATTEMPTS)
+            else:
+                # Более новое изменение пары важнее неудавшегося
+                pending.setdefault(key, state)
+    schedule()
+
+
+def pending_for(user_id):
+    """Ещё не записанные изменения пользователя: {author_id: подписан}."""
+    with lock:
+        return {
+            author: state[1] for (follower, author), state in pending.items()
+            if follower == user_id and state[0] != state[1]
+        }
+
+
+def is_following(user, author):
+    if not user.is_authenticated:
+        return False
+    following = pending_for(user.pk).get(author.pk)
+    if following is None:
+        following = Follow.objects.filter(author=author, user=user).exists()
+    return following
+
+
+def with_pending(user_stats, viewer):
+    """Счётчики user_stats с ещё не записанными подписками viewer.
+
+    Остальные видят счётчики из базы, сам viewer - со своими
+    изменениями: read-your-writes до записи буфера.
+    """
+    if not viewer.is_authenticated:
+        return user_stats
+    changes = pending_for(viewer.pk)
+    if not changes:
+        return user_stats
+    user_stats = copy.copy(user_stats)
+    if user_stats.user_id in changes:
+        user_stats.followers_count += (
+            1 if changes[user_stats.user_id] else -1
+        )
+    if user_stats.user_id == viewer.pk:
+        user_stats.follows_count += sum(
+            1 if following else -1 for following in changes.values()
+        )
+    return user_stats
+
+
+def flush_at_exit():
+    """Пишет буфер при штатной остановке процесса.
+
+    Ошибка только пишется в лог: к этому времени база может быть
+    недоступна, а исключение в atexit не должно ломать остановку.
+    """
+    try:
+        flush()
+    except Exception:
+        logger.exception("Не удалось записать буфер подписок при выходе")
+
+
+atexit.register(flush_at_exit)
@@ -1,9 +1,10 @@
 from django import forms
 
 from .models import Comment, Post
+from .uploads import RejectedUploadsMixin
 
 
-class PostForm(forms.ModelForm):
+class PostForm(RejectedUploadsMixin, forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
@@ -14,6 +15,14 @@ class PostForm(forms.ModelForm):
         }
 
 
+class PostAdminForm(RejectedUploadsMixin, forms.ModelForm):
+    """Все поля записи для админки с теми же проверками загрузки."""
+
+    class Meta:
+        model = Post
+        fields = '__all__'
+
+
 class CommentForm(forms.ModelForm):
     class Meta:
         model = Comment
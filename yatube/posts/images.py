@@ -0,0 +1,141 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import caching, tasks
+from .models import Post, PostImageVariant
+
+# Ширины вариантов для srcset; пропорции и кадрирование как у карточки
+WIDTHS = (480, 960, 1440)
+ASPECT = 350 / 960
+CENTERING = (0.6, 0.0)
+# Форматы в порядке предпочтения; последний - запасной для <img>
+FORMATS = {
+    "AVIF": ("avif", "image/avif", {"quality": 50}),
+    "WEBP": ("webp", "image/webp", {"quality": 75, "method": 4}),
+    "JPEG": ("jpg", "image/jpeg", {"quality": 80, "progressive": True}),
+}
+
+
+def supported_formats():
+    Image.init()
+    return [name for name in FORMATS if name in Image.SAVE]
+
+
+def enqueue(post_pk):
+    tasks.submit(f"variants:{post_pk}", build_variants, post_pk)
+
+
+def build_variants(post_pk):
+    """Создаёт недостающие варианты картинки поста и удаляет устаревшие.
+
+    Файлы вариантов принадлежат картинке, а не посту: их удаляет
+    blobs.release вместе с последней ссылкой на картинку.
+    """
+    post = Post.objects.filter(pk=post_pk).first()
+    if post is None:
+        return
+    post.image_variants.exclude(source=post.image.name or "").delete()
+    if not post.image:
+        return
+    done = set(post.image_variants.values_list("format", "width"))
+    if not done and share_variants(post):
+        caching.purge_posts([post])
+        return
+    with post.image.open() as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image = image.convert("RGB")
+    widths = [w for w in WIDTHS if w <= image.width] or WIDTHS[:1]
+    variants = []
+    for fmt in supported_formats():
+        extension, _, options = FORMATS[fmt]
+        for width in widths:
+            if (fmt, width) in done:
+                continue
+            height = round(width * ASPECT)
+            resized = ImageOps.fit(
+                image, (width, height), Image.LANCZOS, centering=CENTERING
+            )
+            content = BytesIO()
+            resized.save(content, fmt, **options)
+            variant = PostImageVariant(
+                post=post, source=post.image.name, format=fmt,
+                width=width, height=height, size=content.tell()
+            )
+            variant.file.save(
+                variant_name(post.image.name, width, extension),
+                ContentFile(content.getvalue()), save=False
+            )
+            variants.append(variant)
+    with transaction.atomic():
+        PostImageVariant.objects.bulk_create(variants, ignore_conflicts=True)
+    if variants:
+        # Страницы с картинкой без srcset уже могли попасть в кэш
+        caching.purge_posts([post])
+
+
+def share_variants(post):
+    """Берёт готовые варианты той же картинки у другого поста."""
+    shared = {}
+    for variant in PostImageVariant.objects.filter(
+        source=post.image.name
+    ).exclude(post=post):
+        shared[variant.format, variant.width] = PostImageVariant(
+            post=post, source=variant.source, file=variant.file.name,
+            format=variant.format, width=variant.width,
+            height=variant.height, size=variant.size
+        )
+    PostImageVariant.objects.bulk_create(
+        shared.values(), ignore_conflicts=True
+    )
+    return bool(shared)
+
+
+def variant_name(source, width, extension):
+    stem = PurePosixPath(source).stem
+    return f"{stem}_{width}.{extension}"
+
+
+def delete_variants(source):
+    """Удаляет файлы всех возможных вариантов картинки source."""
+    upload_to = PostImageVariant._meta.get_field("file").upload_to
+    for extension, _, _ in FORMATS.values():
+        for width in WIDTHS:
+            default_storage.delete(
+                upload_to + variant_name(source, width, extension)
+            )
+
+
+def largest_url(post):
+    """URL самого широкого готового варианта для <img> или None.
+
+    Запасной формат предпочтительнее: его покажет любой браузер.
+    """
+    fallback = list(FORMATS)[-1]
+    variants = [
+        variant for variant in post.image_variants.all()
+        if variant.source == post.image.name
+    ]
+    if not variants:
+        return None
+    best = max(variants, key=lambda v: (v.format == fallback, v.width))
+    return best.file.url
+
+
+def picture_sources(post):
+    """Группы srcset по форматам для <picture>, лучшие форматы первыми."""
+    by_format = {}
+    variants = sorted(post.image_variants.all(), key=lambda v: v.width)
+    for variant in variants:
+        if variant.source == post.image.name:
+            by_format.setdefault(variant.format, []).append(
+                f"{variant.file.url} {variant.width}w"
+            )
+    return [
+        {"type": FORMATS[fmt][1], "srcset": ", ".join(by_format[fmt])}
+        for fmt in FORMATS if fmt in by_format
+    ]
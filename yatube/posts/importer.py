@@ -0,0 +1,421 @@
+import codecs
+import csv
+import json
+import os
+import posixpath
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from urllib.request import HTTPRedirectHandler, build_opener
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.color import no_style
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import blobs, caching, images, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User
+from .storage import content_addressed_storage
+from .uploads import read_header
+
+FORMATS = ("ndjson", "csv")
+TYPES = ("post", "comment")
+# Поля, которые должны быть строками; ref и post могут быть и числами
+STRING_FIELDS = (
+    "type", "text", "author", "group", "image", "pub_date", "created"
+)
+URL_SCHEMES = ("http", "https")
+DOWNLOAD_CHUNK = 64 * 1024
+# Столько авторов за запрос подписчиков при дозаполнении лент
+AUTHORS_CHUNK = 500
+
+
+class RowError(Exception):
+    pass
+
+
+def read_rows(lines, fmt="ndjson"):
+    """Словари строк из NDJSON или CSV; lines - итератор строк str.
+
+    Ошибка разбора строки не прерывает чтение: вместо словаря
+    приходит RowError.
+    """
+    if fmt == "csv":
+        yield from csv.DictReader(lines)
+        return
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as error:
+            yield RowError(f"не JSON: {error}")
+            continue
+        yield row if isinstance(row, dict) else RowError("не объект JSON")
+
+
+def check_host(url, hosts):
+    """ValueError, если адрес не http(s) или хост не из hosts.
+
+    hosts = None - разрешён любой хост (импорт из командной строки).
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in URL_SCHEMES:
+        raise ValueError(f"адрес {url} не http(s)")
+    if hosts is not None and parts.hostname not in hosts:
+        raise ValueError(f"хост {parts.hostname} не разрешён")
+
+
+class AllowedHostsRedirectHandler(HTTPRedirectHandler):
+    """Редирект проверяется по тем же разрешённым хостам."""
+
+    def __init__(self, hosts):
+        self.hosts = hosts
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        check_host(newurl, self.hosts)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+def download(url, hosts, limit):
+    """Тело ответа по url: не больше limit байт и IMPORT_IMAGE_TIMEOUT с."""
+    check_host(url, hosts)
+    timeout = settings.IMPORT_IMAGE_TIMEOUT
+    deadline = time.monotonic() + timeout
+    opener = build_opener(AllowedHostsRedirectHandler(hosts))
+    with opener.open(url, timeout=timeout) as response:
+        length = response.headers.get("Content-Length", "")
+        if length.isdigit() and int(length) > limit:
+            raise ValueError("файл больше допустимого размера")
+        data = bytearray()
+        while True:
+            # Таймаут сокета - на каждое чтение, а не на весь файл
+            if time.monotonic() > deadline:
+                raise ValueError("картинка загружается слишком долго")
+            chunk = response.read(DOWNLOAD_CHUNK)
+            if not chunk:
+                return bytes(data)
+            data += chunk
+            if len(data) > limit:
+                raise ValueError("файл больше допустимого размера")
+
+
+def decode_lines(stream, encoding="utf-8"):
+    """Строки str из бинарного потока: файла или HttpRequest."""
+    return codecs.iterdecode(stream, encoding)
+
+
+class Importer:
+    """Пакетный импорт постов и комментариев в обход сигналов моделей.
+
+    Строки копятся в пачки по batch_size и пишутся одним INSERT на
+    пачку с заранее выделенными id: комментарии ссылаются на посты
+    того же импорта через их ref, а даты сохраняются как есть, без
+    auto_now_add. Что обычно делают сигналы - счётчики, ссылки на
+    картинки и сброс кэша, - делается один раз на пачку, а ленты
+    подписок дозаполняются один раз после всего импорта.
+
+    Авторы и группы ищутся по username и slug и запоминаются, картинки
+    (путь внутри images_root или http(s)-адрес) загружаются параллельно
+    в image_workers потоков. Адреса разрешены только с хостов
+    image_hosts; None - с любых, только для доверенного импорта из
+    командной строки.
+    """
+
+    retries = 3
+
+    def __init__(self, batch_size=1000, images_root=None, image_workers=4,
+                 default_type="post", progress=None, image_hosts=()):
+        self.batch_size = batch_size
+        self.images_root = images_root
+        self.image_hosts = image_hosts
+        self.image_workers = image_workers
+        self.default_type = default_type
+        self.progress = progress
+        self.users = {}
+        self.groups = {}
+        self.refs = {}
+        self.posts = []
+        self.comments = []
+        self.counts = Counter()
+        # Авторы записанных постов: их подписчикам дозаполняются ленты
+        self.authors = set()
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def run(self, rows):
+        for line, row in enumerate(rows, 1):
+            try:
+                if isinstance(row, RowError):
+                    raise row
+                self.add(line, row)
+            except RowError as error:
+                self.errors.append((line, str(error)))
+            if len(self.posts) + len(self.comments) >= self.batch_size:
+                self.flush()
+        self.flush()
+        if self.counts["posts"] or self.counts["comments"]:
+            reset_sequences([Post, Comment])
+        # После finish() всех пачек: колбэки on_commit идут по порядку
+        transaction.on_commit(self.fill_timelines)
+        return self.summary()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        rows = self.counts["posts"] + self.counts["comments"]
+        return {
+            "posts": self.counts["posts"],
+            "comments": self.counts["comments"],
+            "images": self.counts["images"],
+            "errors": len(self.errors),
+            "seconds": round(elapsed, 3),
+            "rows_per_second": round(rows / elapsed, 1) if elapsed else 0,
+        }
+
+    def add(self, line, row):
+        for field in STRING_FIELDS:
+            if not isinstance(row.get(field, ""), (str, type(None))):
+                raise RowError(f"поле {field} должно быть строкой")
+        kind = row.get("type") or self.default_type
+        if kind not in TYPES:
+            raise RowError(f"неизвестный тип «{kind}»")
+        if not row.get("text"):
+            raise RowError("пустой текст")
+        if kind == "post":
+            self.posts.append((line, row))
+        else:
+            self.comments.append((line, row))
+
+    def flush(self):
+        posts, self.posts = self.posts, []
+        comments, self.comments = self.comments, []
+        if not posts and not comments:
+            return
+        names = self.store_images([row for _, row in posts])
+        self.resolve([row for _, row in posts + comments])
+        for attempt in range(1, self.retries + 1):
+            errors = []
+            # next_pk может упасть раньше, чем пачка построена
+            post_objs, comment_objs = [], []
+            try:
+                with transaction.atomic():
+                    # Сначала посты: комментарии могут ссылаться на них
+                    post_objs = self.build_posts(posts, names, errors)
+                    comment_objs = self.build_comments(comments, errors)
+                    insert(Post, post_objs)
+                    insert(Comment, comment_objs)
+                    self.after_insert(post_objs, comment_objs)
+            except (IntegrityError, OperationalError) as error:
+                # id выделены по MAX(id): их могла занять параллельная
+                # запись. Пачку пробуем ещё раз с новыми id
+                for post in post_objs:
+                    self.refs.pop(post.import_ref, None)
+                if attempt == self.retries:
+                    line = (posts or comments)[0][0]
+                    self.errors.append((line, f"пачка не записана: {error}"))
+                    return
+            else:
+                break
+        self.errors.extend(errors)
+        self.counts["posts"] += len(post_objs)
+        self.counts["comments"] += len(comment_objs)
+        if self.progress is not None:
+            self.progress(self.summary())
+
+    def resolve(self, rows):
+        """Дозагружает в карты недостающих авторов и группы пачки."""
+        usernames = {row.get("author") for row in rows} - self.users.keys()
+        self.users.update(User.objects.filter(
+            username__in=usernames - {None, ""}
+        ).values_list("username", "pk"))
+        slugs = {row.get("group") for row in rows} - self.groups.keys()
+        self.groups.update(Group.objects.filter(
+            slug__in=slugs - {None, ""}
+        ).values_list("slug", "pk"))
+
+    def author_id(self, row):
+        author_id = self.users.get(row.get("author"))
+        if author_id is None:
+            raise RowError(f"нет автора «{row.get('author')}»")
+        return author_id
+
+    def group_id(self, row):
+        if not row.get("group"):
+            return None
+        group_id = self.groups.get(row["group"])
+        if group_id is None:
+            raise RowError(f"нет группы «{row['group']}»")
+        return group_id
+
+    def build_posts(self, rows, names, errors):
+        next_id = next_pk(Post)
+        posts = []
+        for (line, row), name in zip(rows, names):
+            try:
+                if isinstance(name, RowError):
+                    raise name
+                post = Post(
+                    pk=next_id, text=row["text"], image=name,
+                    author_id=self.author_id(row),
+                    group_id=self.group_id(row),
+                    pub_date=parse_date(row.get("pub_date"))
+                )
+            except RowError as error:
+                errors.append((line, str(error)))
+                continue
+            post.import_ref = str(row.get("ref") or "") or None
+            if post.import_ref is not None:
+                self.refs[post.import_ref] = post.pk
+            posts.append(post)
+            next_id += 1
+        return posts
+
+    def build_comments(self, rows, errors):
+        next_id = next_pk(Comment)
+        comments = []
+        for line, row in rows:
+            try:
+                post_id = self.refs.get(str(row.get("post")))
+                if post_id is None:
+                    raise RowError(f"нет поста с ref «{row.get('post')}»")
+                comment = Comment(
+                    pk=next_id, post_id=post_id, text=row["text"],
+                    author_id=self.author_id(row),
+                    created=parse_date(row.get("created"))
+                )
+            except RowError as error:
+                errors.append((line, str(error)))
+                continue
+            comments.append(comment)
+            next_id += 1
+        return comments
+
+    def after_insert(self, posts, comments):
+        authors = Counter(post.author_id for post in posts)
+        for author_id, number in authors.items():
+            stats.change(author_id, posts_count=number)
+        for name, number in Counter(
+            post.image.name for post in posts if post.image
+        ).items():
+            blobs.acquire(name, number)
+        keys = [caching.FEED]
+        for post in posts:
+            keys.extend(caching.post_keys(post))
+        keys.extend(f"post-{comment.post_id}" for comment in comments)
+        with_images = [
+            (post.pk, post.image.name) for post in posts if post.image
+        ]
+        transaction.on_commit(
+            lambda: self.finish(set(authors), keys, with_images)
+        )
+
+    def finish(self, authors, keys, with_images):
+        cache.delete_many(
+            [timeline.RECENT_KEY.format(author_id) for author_id in authors]
+        )
+        self.authors.update(authors)
+        caching.purge(*keys)
+        for pk, name in with_images:
+            thumbnails.enqueue(name)
+            images.enqueue(pk)
+
+    def fill_timelines(self):
+        """Дозаполняет ленты один раз за импорт, а не на каждую пачку."""
+        authors, self.authors = list(self.authors), set()
+        for start in range(0, len(authors), AUTHORS_CHUNK):
+            for user_id, author_id in Follow.objects.filter(
+                author__in=authors[start:start + AUTHORS_CHUNK]
+            ).values_list("user_id", "author_id").iterator():
+                timeline.backfill(user_id, author_id)
+
+    def store_images(self, rows):
+        """Имена сохранённых картинок по строкам пачки (или RowError)."""
+        sources = [row.get("image") or None for row in rows]
+        unique = list(dict.fromkeys(filter(None, sources)))
+        if not unique:
+            return sources
+        with ThreadPoolExecutor(self.image_workers) as pool:
+            stored = dict(zip(unique, pool.map(self.store_image, unique)))
+        self.counts["images"] += sum(
+            1 for name in stored.values() if not isinstance(name, RowError)
+        )
+        return [stored.get(source) for source in sources]
+
+    def store_image(self, source):
+        if source is None:
+            return None
+        try:
+            data = self.read_image(source)
+        except (OSError, ValueError) as error:
+            return RowError(f"картинка {source}: {error}")
+        header = read_header(data)
+        if header is None:
+            return RowError(f"картинка {source}: не изображение")
+        width, height = header[1]
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            return RowError(f"картинка {source}: слишком большая")
+        filename = posixpath.basename(urlsplit(source).path) or "image"
+        return content_addressed_storage.save(
+            f"posts/{filename}", ContentFile(data)
+        )
+
+    def read_image(self, source):
+        limit = settings.POST_IMAGE_MAX_SIZE
+        if urlsplit(source).scheme in URL_SCHEMES:
+            return download(source, self.image_hosts, limit)
+        if self.images_root is None:
+            raise ValueError("не задан каталог картинок")
+        root = os.path.realpath(self.images_root)
+        path = os.path.realpath(os.path.join(root, source))
+        if os.path.commonpath([root, path]) != root:
+            raise ValueError("путь вне каталога картинок")
+        with open(path, "rb") as file:
+            data = file.read(limit + 1)
+        if len(data) > limit:
+            raise ValueError("файл больше допустимого размера")
+        return data
+
+
+def parse_date(value):
+    if not value:
+        return timezone.now()
+    try:
+        date = parse_datetime(value)
+    except (ValueError, TypeError):
+        # Формат верный, но такой даты нет (30 февраля) или не строка
+        date = None
+    if date is None:
+        raise RowError(f"неверная дата «{value}»")
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date, timezone.utc)
+    return date
+
+
+def next_pk(model):
+    return (model.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+
+
+def insert(model, objs):
+    """INSERT пачками как у loaddata: raw не трогает auto_now_add."""
+    if not objs:
+        return
+    fields = model._meta.concrete_fields
+    size = connection.ops.bulk_batch_size(fields, objs) or len(objs)
+    for start in range(0, len(objs), size):
+        model._base_manager._insert(
+            objs[start:start + size], fields=fields, raw=True
+        )
+
+
+def reset_sequences(models):
+    """Сдвигает последовательности id за выделенные вручную значения."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    if statements:
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
@@ -0,0 +1,160 @@
+import asyncio
+import io
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.test import override_settings
+from django.urls import reverse
+
+from posts.models import Post
+from yatube.asgi import WsgiToAsgi, build_environ
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает WSGI и ASGI (yatube.asgi) на текущей базе под "
+        "параллельной нагрузкой: --concurrency одновременных клиентов, "
+        "для WSGI - столько же потоков, как у многопоточного сервера. "
+        "Запросы идут прямо в приложение, без сети. Данные можно "
+        "создать командой seed_yatube."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--asgi-threads", type=int, default=8,
+                            help="Потоков пула ASGI")
+        parser.add_argument(
+            "--query-workers", type=int, nargs="*", default=[1, 4],
+            help="QUERY_WORKERS для каждого прогона; 1 - без параллельных "
+                 "запросов страницы"
+        )
+        parser.add_argument(
+            "--with-cache", action="store_true",
+            help="Повторять адреса как есть; по умолчанию у каждого "
+                 "запроса своя строка запроса, чтобы кэш страниц не "
+                 "отвечал вместо представлений"
+        )
+        parser.add_argument("--paths", nargs="*",
+                            help="Адреса; по умолчанию главная, профиль "
+                                 "и пост")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or self.default_paths()
+        wsgi = get_wsgi_application()
+        asgi = WsgiToAsgi(wsgi, options["asgi_threads"])
+        self.stdout.write(f"Адреса: {', '.join(paths)}")
+        try:
+            for workers in options["query_workers"]:
+                with override_settings(QUERY_WORKERS=workers, DEBUG=False):
+                    self.compare(wsgi, asgi, paths, options, workers)
+        finally:
+            asgi.executor.shutdown()
+
+    def compare(self, wsgi, asgi, paths, options, workers):
+        for name, application, bench in (
+            ("wsgi", wsgi, self.bench_wsgi),
+            ("asgi", asgi, self.bench_asgi),
+        ):
+            bench(application, paths, options)  # прогрев
+            self.report(
+                f"{name}, QUERY_WORKERS={workers}",
+                *bench(application, paths, options)
+            )
+
+    def default_paths(self):
+        post = Post.objects.order_by("pk").select_related("author").first()
+        if post is None:
+            raise CommandError("В базе нет постов: запустите seed_yatube")
+        return [
+            reverse("posts:index"),
+            reverse("posts:profile", args=[post.author.username]),
+            reverse("posts:post_view", args=[post.author.username, post.pk]),
+        ]
+
+    def requests(self, paths, options):
+        self.run_number = getattr(self, "run_number", 0) + 1
+        return [
+            scope(
+                paths[number % len(paths)],
+                b"" if options["with_cache"]
+                else f"bench={self.run_number}-{number}".encode()
+            )
+            for number in range(options["requests"])
+        ]
+
+    def bench_wsgi(self, application, paths, options):
+        def request(item):
+            start = time.perf_counter()
+            status = []
+            body = application(
+                build_environ(item, io.BytesIO()),
+                lambda line, headers, exc_info=None: status.append(line)
+            )
+            try:
+                for _ in body:
+                    pass
+            finally:
+                body.close()
+            return time.perf_counter() - start, status[0].startswith("2")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options["concurrency"]) as executor:
+            results = list(executor.map(
+                request, self.requests(paths, options)
+            ))
+        return results, time.perf_counter() - started
+
+    def bench_asgi(self, application, paths, options):
+        async def request(item):
+            start = time.perf_counter()
+            status = []
+
+            async def receive():
+                return {"type": "http.request", "body": b""}
+
+            async def send(message):
+                if message["type"] == "http.response.start":
+                    status.append(message["status"])
+
+            await application(item, receive, send)
+            return time.perf_counter() - start, 200 <= status[0] < 300
+
+        async def client(queue, results):
+            while queue:
+                results.append(await request(queue.pop()))
+
+        async def run():
+            queue = self.requests(paths, options)
+            results = []
+            await asyncio.gather(*(
+                client(queue, results)
+                for _ in range(options["concurrency"])
+            ))
+            return results
+
+        started = time.perf_counter()
+        results = asyncio.run(run())
+        return results, time.perf_counter() - started
+
+    def report(self, name, results, wall):
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, ok in results if not ok)
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:<24} p50 {percentiles[49] * 1000:8.2f} мс "
+            f"p95 {percentiles[94] * 1000:8.2f} мс "
+            f"{len(results) / wall:8.1f}/с ошибок {errors}"
+        )
+
+
+def scope(path, query_string=b""):
+    return {
+        "type": "http", "method": "GET", "path": path,
+        "query_string": query_string,
+        "headers": [(b"host", b"localhost")],
+        "server": ("localhost", 80), "client": ("127.0.0.1", 0),
+    }
@@ -0,0 +1,147 @@
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.test import override_settings
+
+from posts.models import Comment, Post, User, UserStats
+from posts.paginator import older_than
+
+# Настройки SQLite по умолчанию: журнал отката, fsync на каждый коммит
+PLAIN_PRAGMAS = {"journal_mode": "delete", "synchronous": "full"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагружает временную базу SQLite из нескольких потоков чтениями "
+        "ленты и записью комментариев и сравнивает настройки SQLite по "
+        "умолчанию с SQLITE_PRAGMAS: операции в секунду, задержки "
+        "и ошибки «database is locked»."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=5)
+        parser.add_argument("--writes", type=float, default=0.2,
+                            help="Доля операций записи")
+        parser.add_argument("--posts", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        modes = (
+            ("plain", PLAIN_PRAGMAS, {}),
+            ("tuned", None, None),
+        )
+        for name, pragmas, db_options in modes:
+            # Своя база на режим: обёртки соединений кэшируются по имени
+            alias = f"bench_sqlite_{name}"
+            with tempfile.TemporaryDirectory() as directory:
+                try:
+                    self.add_database(
+                        alias, os.path.join(directory, "bench.sqlite3"),
+                        db_options, options["posts"]
+                    )
+                    if pragmas is None:
+                        self.run(name, alias, options)
+                    else:
+                        with override_settings(SQLITE_PRAGMAS=pragmas):
+                            self.run(name, alias, options)
+                finally:
+                    connections[alias].close()
+                    del connections.databases[alias]
+
+    def add_database(self, alias, path, db_options, posts):
+        settings_dict = dict(connections["default"].settings_dict)
+        settings_dict.update(NAME=path, TEST={})
+        if db_options is not None:
+            settings_dict["OPTIONS"] = db_options
+        connections.databases[alias] = settings_dict
+        call_command("migrate", database=alias, verbosity=0)
+        # Только bulk_create: сигналы моделей пишут в базу default
+        User.objects.using(alias).bulk_create([User(username="bench")])
+        author = User.objects.using(alias).get(username="bench")
+        UserStats.objects.using(alias).bulk_create([UserStats(user=author)])
+        Post.objects.using(alias).bulk_create(
+            (Post(text=f"Пост {i}", author=author) for i in range(posts)),
+            batch_size=500
+        )
+        connections[alias].close()
+
+    def run(self, name, alias, options):
+        posts = Post.objects.using(alias)
+        post_ids = list(posts.values_list("pk", flat=True))
+        author_id = posts.values_list("author_id", flat=True).first()
+        results = {"read": [], "write": [], "locked": 0}
+        lock = threading.Lock()
+        deadline = time.perf_counter() + options["seconds"]
+
+        def worker(number):
+            rnd = random.Random(options["seed"] + number)
+            reads, writes, locked = [], [], 0
+            try:
+                while time.perf_counter() < deadline:
+                    is_write = rnd.random() < options["writes"]
+                    post_id = rnd.choice(post_ids)
+                    start = time.perf_counter()
+                    try:
+                        if is_write:
+                            self.write(alias, post_id, author_id)
+                        else:
+                            self.read(alias, post_id)
+                    except OperationalError:
+                        locked += 1
+                        continue
+                    elapsed = time.perf_counter() - start
+                    (writes if is_write else reads).append(elapsed)
+            finally:
+                connections[alias].close()
+            with lock:
+                results["read"].extend(reads)
+                results["write"].extend(writes)
+                results["locked"] += locked
+
+        threads = [
+            threading.Thread(target=worker, args=(number,))
+            for number in range(options["workers"])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reads, writes = results["read"], results["write"]
+        seconds = options["seconds"]
+        self.stdout.write(
+            f"{name:>5}: чтений {len(reads) / seconds:8.1f}/с "
+            f"p50 {self.ms(reads, 50)} p95 {self.ms(reads, 95)}, "
+            f"записей {len(writes) / seconds:7.1f}/с "
+            f"p50 {self.ms(writes, 50)} p95 {self.ms(writes, 95)}, "
+            f"блокировок {results['locked']}"
+        )
+
+    def read(self, alias, post_id):
+        posts = Post.objects.using(alias).select_related("author")
+        list(older_than(posts, None)[:11])
+        list(Comment.objects.using(alias).filter(post_id=post_id)[:20])
+
+    def write(self, alias, post_id, author_id):
+        with transaction.atomic(using=alias):
+            Comment.objects.using(alias).bulk_create([
+                Comment(post_id=post_id, author_id=author_id, text="bench")
+            ])
+            UserStats.objects.using(alias).filter(user=author_id).update(
+                posts_count=F("posts_count") + 1
+            )
+
+    def ms(self, samples, percent):
+        if len(samples) < 2:
+            return "      - мс"
+        value = statistics.quantiles(samples, n=100)[percent - 1]
+        return f"{value * 1000:7.2f} мс"
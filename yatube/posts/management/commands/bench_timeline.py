@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from posts import caching
+from posts.models import Follow, Post, TimelineEntry, User
+from posts.timeline import TimelinePaginator, refresh_celebrities
+
+PREFIX = "bench_timeline_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает рассылку постов всем подписчикам (push) и гибридную "
+        "ленту (push + pull для популярных авторов) по числу вставок "
+        "на пост и времени чтения ленты. Данные откатываются."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--followers", type=int, default=2000)
+        parser.add_argument("--authors", type=int, default=50)
+        parser.add_argument("--fans", type=int, default=20)
+        parser.add_argument("--posts", type=int, default=20)
+        parser.add_argument("--readers", type=int, default=100)
+        parser.add_argument("--threshold", type=int, default=1000)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options["seed"])
+        with transaction.atomic():
+            self.seed(options)
+            modes = (
+                ("push", 10 ** 12),
+                ("hybrid", options["threshold"]),
+            )
+            for name, threshold in modes:
+                with override_settings(
+                    TIMELINE_CELEBRITY_FOLLOWERS=threshold,
+                    CACHES=caching.isolated_caches("bench_timeline")
+                ):
+                    self.run(name, options)
+            transaction.set_rollback(True)
+
+    def seed(self, options):
+        User.objects.bulk_create(
+            User(username=f"{PREFIX}{i}")
+            for i in range(options["followers"] + options["authors"] + 1)
+        )
+        users = list(User.objects.filter(
+            username__startswith=PREFIX
+        ).values_list("pk", flat=True))
+        self.celebrity = users[0]
+        self.authors = users[1:options["authors"] + 1]
+        self.readers = users[options["authors"] + 1:]
+        follows = [
+            Follow(user_id=reader, author_id=self.celebrity)
+            for reader in self.readers
+        ]
+        for author in self.authors:
+            fans = random.sample(
+                self.readers, min(options["fans"], len(self.readers))
+            )
+            follows.extend(
+                Follow(user_id=reader, author_id=author) for reader in fans
+            )
+        Follow.objects.bulk_create(follows, batch_size=500)
+
+    def run(self, name, options):
+        TimelineEntry.objects.all().delete()
+        Post.objects.filter(author__username__startswith=PREFIX).delete()
+        # Фоновая задача не увидела бы незакоммиченных данных бенчмарка
+        refresh_celebrities()
+
+        writes = []
+        for _ in range(options["posts"]):
+            for author in [self.celebrity] + self.authors:
+                start = time.perf_counter()
+                Post.objects.create(text="bench", author_id=author)
+                writes.append(time.perf_counter() - start)
+        entries = TimelineEntry.objects.count()
+
+        reads = []
+        sample = random.sample(
+            self.readers, min(options["readers"], len(self.readers))
+        )
+        for reader in sample:
+            start = time.perf_counter()
+            list(TimelinePaginator(User(pk=reader), 10).get_page())
+            reads.append(time.perf_counter() - start)
+
+        self.stdout.write(
+            f"{name:>6}: {entries / len(writes):8.1f} вставок на пост, "
+            f"запись p50 {self.ms(writes, 50)} p95 {self.ms(writes, 95)}, "
+            f"чтение p50 {self.ms(reads, 50)} p95 {self.ms(reads, 95)}"
+        )
+
+    def ms(self, samples, percent):
+        value = statistics.quantiles(samples, n=100)[percent - 1]
+        return f"{value * 1000:7.2f} мс"
@@ -0,0 +1,372 @@
+import itertools
+import json
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Max
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from posts import caching, follows
+from posts.models import Group, Post, User
+from posts.seeding import WORDS, Seeder
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def quantiles(samples):
+    if len(samples) < 2:
+        return (samples or [0.0]) * 99
+    return statistics.quantiles(samples, n=100)
+
+
+def unlimited(rules):
+    """Те же правила RATE_LIMITS с недостижимым порогом.
+
+    Проверки остаются в замере, но сценарий записи из сотен запросов
+    одного пользователя не упирается в 429.
+    """
+    return {
+        name: (algorithm, 10 ** 9, period, by)
+        for name, (algorithm, _, period, by) in rules.items()
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет временную базу синтетическими данными и прогоняет "
+        "через тестовый клиент все адреса posts.urls: задержки "
+        "p50/p95/p99, запросы к базе на ответ и пропускная способность. "
+        "--save сохраняет результат в JSON, --compare сравнивает "
+        "с сохранённым и завершается ошибкой при регрессии. Каждое "
+        "представление начинает с пустого отдельного кэша в памяти. "
+        "Ограничения частоты не срабатывают, а ответ 429 считается "
+        "ошибкой прогона. У каждого GET своя строка запроса, чтобы "
+        "кэш страниц не отвечал вместо представлений (--with-cache - "
+        "мерить вместе с ним)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=300)
+        parser.add_argument("--posts", type=int, default=3000)
+        parser.add_argument("--groups", type=int, default=10)
+        parser.add_argument("--comments", type=float, default=3)
+        parser.add_argument("--follows", type=float, default=15)
+        parser.add_argument("--skew", type=float, default=1.2,
+                            help="Показатель степенного закона подписок")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--requests", type=int, default=100,
+                            help="Запросов на каждое представление")
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument("--views", nargs="*",
+                            help="Только эти представления")
+        parser.add_argument(
+            "--existing", action="store_true",
+            help="Мерить на текущей базе без заполнения; сценарии записи "
+                 "её меняют"
+        )
+        parser.add_argument(
+            "--with-cache", action="store_true",
+            help="Повторять адреса как есть; по умолчанию у каждого GET "
+                 "своя строка запроса, чтобы кэш страниц не отвечал "
+                 "вместо представлений"
+        )
+        parser.add_argument("--save", help="Куда сохранить JSON")
+        parser.add_argument("--compare", help="JSON прошлого прогона")
+        parser.add_argument("--threshold", type=float, default=20,
+                            help="Допустимый рост p95, %%")
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = json.load(file)
+        with override_settings(
+            DEBUG=False, RATE_LIMITS=unlimited(settings.RATE_LIMITS)
+        ):
+            if options["existing"]:
+                report = self.bench(options)
+            else:
+                report = self.bench_temporary(options)
+        throttled = [
+            name for name, result in report["results"].items()
+            if result["throttled"]
+        ]
+        if throttled:
+            raise CommandError(
+                f"Ответы 429, замер недействителен: {', '.join(throttled)}"
+            )
+        if options["save"]:
+            with open(options["save"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if baseline is not None:
+            self.compare(baseline, report, options["threshold"])
+
+    def bench_temporary(self, options):
+        """Прогон на временной базе, созданной как тестовая."""
+        with tempfile.TemporaryDirectory() as directory:
+            test_settings = connection.settings_dict["TEST"]
+            old_test_name = test_settings["NAME"]
+            test_settings["NAME"] = os.path.join(directory, "bench.sqlite3")
+            old_name = connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False
+            )
+            try:
+                started = time.perf_counter()
+                Seeder(**self.seed_options(options)).run()
+                self.stdout.write(
+                    f"Данные созданы за {time.perf_counter() - started:.1f} с"
+                )
+                return self.bench(options)
+            finally:
+                # Буфер подписок пишется во временную базу, пока она есть,
+                # а не при выходе - в настоящую
+                follows.flush()
+                connections.close_all()
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+                test_settings["NAME"] = old_test_name
+
+    def seed_options(self, options):
+        return {
+            key: options[key] for key in (
+                "users", "posts", "groups", "comments", "follows", "skew",
+                "seed",
+            )
+        }
+
+    def bench(self, options):
+        self.sample = self.load_sample(options["seed"])
+        self.bust_cache = not options["with_cache"]
+        self.numbers = itertools.count()
+        names = options["views"] or list(self.scenarios())
+        results = {}
+        for name in names:
+            if name not in self.scenarios():
+                raise CommandError(f"Нет сценария {name}")
+            with override_settings(
+                CACHES=caching.isolated_caches("bench_views")
+            ):
+                results[name] = self.run(name, options)
+            self.stdout.write(self.format(name, results[name]))
+        return {
+            "options": dict(
+                self.seed_options(options), with_cache=options["with_cache"]
+            ),
+            "results": results,
+        }
+
+    def load_sample(self, seed):
+        rnd = random.Random(seed)
+        last = Post.objects.aggregate(last=Max("pk"))["last"]
+        if last is None:
+            raise CommandError("В базе нет постов")
+        posts = list(Post.objects.filter(
+            pk__in=rnd.sample(range(1, last + 1), min(last, 500))
+        ).order_by("pk").values_list("author__username", "pk"))
+        author, post_id = posts[0]
+        author = User.objects.get(username=author)
+        # Читатель с подписками для ленты, автор поста для его правки
+        reader = User.objects.filter(
+            follower__isnull=False
+        ).order_by("pk").first()
+        return {
+            "random": rnd,
+            "posts": posts,
+            "usernames": [username for username, _ in posts],
+            "slugs": list(Group.objects.values_list("slug", flat=True)),
+            "words": WORDS,
+            "reader": reader or author,
+            "author": author,
+            "own_post": post_id,
+        }
+
+    def scenarios(self):
+        """Имя представления -> (кто, метод, функция адреса и данных)."""
+        return {
+            "posts:index": ("guest", "get", self.index),
+            "posts:group": ("guest", "get", self.group),
+            "posts:search": ("guest", "get", self.search),
+            "posts:profile": ("guest", "get", self.profile),
+            "posts:post_view": ("guest", "get", self.post_view),
+            "posts:follow_index": ("reader", "get", self.follow_index),
+            "posts:new_post": ("author", "post", self.new_post),
+            "posts:post_edit": ("author", "get", self.post_edit),
+            "posts:add_comment": ("reader", "post", self.add_comment),
+            "posts:profile_follow": ("reader", "get", self.profile_follow),
+            "posts:profile_unfollow": (
+                "reader", "get", self.profile_unfollow
+            ),
+        }
+
+    def pick(self, key):
+        return self.sample["random"].choice(self.sample[key])
+
+    def index(self):
+        return reverse("posts:index"), None
+
+    def group(self):
+        return reverse("posts:group", args=[self.pick("slugs")]), None
+
+    def search(self):
+        return reverse("posts:search"), {"q": self.pick("words")}
+
+    def profile(self):
+        return reverse("posts:profile", args=[self.pick("usernames")]), None
+
+    def post_view(self):
+        return reverse("posts:post_view", args=self.pick("posts")), None
+
+    def follow_index(self):
+        return reverse("posts:follow_index"), None
+
+    def new_post(self):
+        return reverse("posts:new_post"), {"text": "Пост из бенчмарка"}
+
+    def post_edit(self):
+        return reverse("posts:post_edit", args=[
+            self.sample["author"].username, self.sample["own_post"]
+        ]), None
+
+    def add_comment(self):
+        return reverse("posts:add_comment", args=self.pick("posts")), {
+            "text": "Комментарий из бенчмарка"
+        }
+
+    def profile_follow(self):
+        return reverse(
+            "posts:profile_follow", args=[self.pick("usernames")]
+        ), None
+
+    def profile_unfollow(self):
+        return reverse(
+            "posts:profile_unfollow", args=[self.pick("usernames")]
+        ), None
+
+    def run(self, name, options):
+        who, method, make_request = self.scenarios()[name]
+        lock = threading.Lock()
+        latencies, queries, errors, throttled = [], [], [], []
+        workers = max(1, options["concurrency"])
+        per_worker = max(1, options["requests"] // workers)
+
+        def worker():
+            client = Client()
+            if who != "guest":
+                client.force_login(self.sample[who])
+            result = self.measure(
+                client, method, make_request, lock,
+                options["warmup"], per_worker
+            )
+            with lock:
+                latencies.extend(result[0])
+                queries.extend(result[1])
+                errors.append(result[2])
+                throttled.append(result[3])
+
+        def thread_worker():
+            try:
+                worker()
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        if workers == 1:
+            # В том же потоке: без лишнего соединения и переключений
+            worker()
+        else:
+            threads = [
+                threading.Thread(target=thread_worker) for _ in range(workers)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        wall = time.perf_counter() - started
+        percentiles = quantiles(latencies)
+        return {
+            "requests": len(latencies),
+            "errors": sum(errors),
+            "throttled": sum(throttled),
+            "p50_ms": round(percentiles[49] * 1000, 3),
+            "p95_ms": round(percentiles[94] * 1000, 3),
+            "p99_ms": round(percentiles[98] * 1000, 3),
+            "queries": round(statistics.mean(queries or [0]), 2),
+            "rps": round(len(latencies) / wall, 1),
+        }
+
+    def measure(self, client, method, make_request, lock, warmup, count):
+        """Задержки, запросы к базе, число ошибок и ответов 429.
+
+        Ответ 429 - это ограничитель, а не представление: его время
+        и запросы в замер не входят.
+        """
+        counter = QueryCounter()
+        latencies, queries, failed, throttled = [], [], 0, 0
+        for number in range(warmup + count):
+            with lock:
+                url, data = make_request()
+                if method == "get" and self.bust_cache:
+                    data = dict(data or {}, bench=next(self.numbers))
+            counter.count = 0
+            start = time.perf_counter()
+            status = None
+            try:
+                with connection.execute_wrapper(counter):
+                    status = getattr(client, method)(url, data).status_code
+            except Exception:
+                pass
+            elapsed = time.perf_counter() - start
+            if number < warmup:
+                continue
+            if status is None or status >= 400:
+                failed += 1
+            if status == 429:
+                throttled += 1
+                continue
+            latencies.append(elapsed)
+            queries.append(counter.count)
+        return latencies, queries, failed, throttled
+
+    def format(self, name, result):
+        return (
+            f"{name:<24} p50 {result['p50_ms']:8.2f} мс "
+            f"p95 {result['p95_ms']:8.2f} мс p99 {result['p99_ms']:8.2f} мс "
+            f"запросов {result['queries']:6.2f} {result['rps']:8.1f}/с "
+            f"ошибок {result['errors']} 429 {result['throttled']}"
+        )
+
+    def compare(self, baseline, report, threshold):
+        regressions = []
+        for name, result in report["results"].items():
+            old = baseline["results"].get(name)
+            if old is None:
+                continue
+            change = (result["p95_ms"] / max(old["p95_ms"], 0.001) - 1) * 100
+            # Ползапроса в среднем - уже лишний запрос на части ответов
+            more_queries = result["queries"] - old["queries"] >= 0.5
+            flag = ""
+            if change > threshold or more_queries:
+                flag = " РЕГРЕССИЯ"
+                regressions.append(name)
+            self.stdout.write(
+                f"{name:<24} p95 {old['p95_ms']:8.2f} -> "
+                f"{result['p95_ms']:8.2f} мс ({change:+.0f}%), запросов "
+                f"{old['queries']} -> {result['queries']}{flag}"
+            )
+        if regressions:
+            raise CommandError(f"Регрессии: {', '.join(regressions)}")
@@ -0,0 +1,50 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import exporter
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Потоковая выгрузка всего сайта или данных одного пользователя. "
+        "ndjson без --output пишется в stdout одним потоком, иначе в "
+        "каталог --output по файлу на таблицу (csv, ndjson или parquet, "
+        "если установлен pyarrow)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="username; без него весь сайт")
+        parser.add_argument("--format", choices=exporter.FORMATS,
+                            default="ndjson")
+        parser.add_argument("--output", help="Каталог для файлов таблиц")
+        parser.add_argument("--chunk-size", type=int,
+                            default=exporter.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = User.objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Нет пользователя {options['user']}")
+        if options["output"] is None:
+            if options["format"] != "ndjson":
+                raise CommandError("Для csv и parquet нужен --output")
+            out = getattr(self.stdout, "buffer", None)
+            for chunk in exporter.ndjson(user, options["chunk_size"]):
+                if out is None:
+                    self.stdout.write(chunk.decode(), ending="")
+                else:
+                    out.write(chunk)
+            return
+        os.makedirs(options["output"], exist_ok=True)
+        try:
+            written = exporter.write_files(
+                options["output"], options["format"], user,
+                options["chunk_size"]
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+        for name, count in written.items():
+            self.stdout.write(f"{name}: {count}")
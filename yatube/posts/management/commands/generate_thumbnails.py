@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.images import build_variants
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт миниатюры и варианты для srcset "
+        "для уже загруженных картинок."
+    )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image="").exclude(
+            image__isnull=True
+        ).values_list("pk", "image")
+        done = 0
+        for pk, name in posts.iterator():
+            generate(name)
+            build_variants(pk)
+            done += 1
+        self.stdout.write(f"Обработано изображений: {done}")
@@ -0,0 +1,60 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import tasks
+from posts.importer import FORMATS, TYPES, Importer, decode_lines, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Импортирует посты и комментарии из NDJSON или CSV пачками "
+        "по --batch-size строк. Строка поста: text, author (username), "
+        "group (slug), pub_date, image, ref; строка комментария: "
+        "type=comment, post (ref поста), author, text, created."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл или - для stdin")
+        parser.add_argument("--format", choices=FORMATS)
+        parser.add_argument("--type", choices=TYPES, default="post",
+                            help="Тип строк без поля type")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--images", help="Каталог с картинками")
+        parser.add_argument("--image-workers", type=int, default=8)
+        parser.add_argument("--show-errors", type=int, default=20)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or (
+            "csv" if path.endswith(".csv") else "ndjson"
+        )
+        importer = Importer(
+            batch_size=options["batch_size"], images_root=options["images"],
+            image_workers=options["image_workers"],
+            default_type=options["type"], progress=self.progress,
+            image_hosts=None
+        )
+        try:
+            stream = (
+                sys.stdin.buffer if path == "-" else open(path, "rb")
+            )
+        except OSError as error:
+            raise CommandError(error)
+        with stream:
+            summary = importer.run(read_rows(decode_lines(stream), fmt))
+        for line, message in importer.errors[:options["show_errors"]]:
+            self.stderr.write(f"строка {line}: {message}")
+        self.stdout.write(
+            f"Готово: постов {summary['posts']}, комментариев "
+            f"{summary['comments']}, картинок {summary['images']}, "
+            f"ошибок {summary['errors']}, {summary['seconds']} с"
+        )
+        # Миниатюры и варианты картинок делает фоновая очередь
+        tasks.wait()
+
+    def progress(self, summary):
+        self.stdout.write(
+            f"постов {summary['posts']}, комментариев "
+            f"{summary['comments']}, {summary['rows_per_second']} строк/с"
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import refresh_celebrities
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает популярных авторов для лент подписок. Запускается "
+        "по расписанию чаще, чем раз в TIMELINE_CACHE_TIMEOUT секунд, "
+        "чтобы страницы не ждали пересчёта."
+    )
+
+    def handle(self, *args, **options):
+        ids = refresh_celebrities()
+        self.stdout.write(f"Популярных авторов: {len(ids)}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.models import User
+from posts.stats import recompute
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики UserStats и исправляет расхождения."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        user_ids = User.objects.order_by("pk").values_list("pk", flat=True)
+        fixed = 0
+        batch = []
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if len(batch) == options["batch_size"]:
+                fixed += len(recompute(batch))
+                batch = []
+        if batch:
+            fixed += len(recompute(batch))
+        self.stdout.write(f"Исправлено строк: {fixed}")
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.seeding import PASSWORD, Seeder
+
+
+class Command(BaseCommand):
+    help = (
+        "Заполняет базу синтетическими данными для воспроизведения "
+        "проблем производительности: пользователи, группы, посты, "
+        "комментарии и подписки со степенным распределением "
+        "популярности. Один --seed даёт одни и те же данные. "
+        f"Пароль всех пользователей - «{PASSWORD}»."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10000)
+        parser.add_argument("--posts", type=int, default=100000)
+        parser.add_argument("--groups", type=int, default=50)
+        parser.add_argument("--comments", type=float, default=3,
+                            help="Комментариев на пост в среднем")
+        parser.add_argument("--follows", type=float, default=20,
+                            help="Подписок на пользователя в среднем")
+        parser.add_argument("--skew", type=float, default=1.2,
+                            help="Показатель степенного закона подписок")
+        parser.add_argument("--days", type=int, default=365,
+                            help="За сколько дней разбросаны даты постов")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--images", type=float, default=0,
+                            help="Доля постов с картинкой-заглушкой, 0..1")
+        parser.add_argument("--placeholders", type=int, default=20,
+                            help="Сколько разных заглушек")
+        parser.add_argument(
+            "--no-timelines", dest="timelines", action="store_false",
+            help="Не заполнять ленты подписок: на десятках миллионов "
+                 "подписок это самая долгая часть"
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options["images"] <= 1:
+            raise CommandError("--images - доля от 0 до 1")
+        if options["users"] < 1 or options["batch_size"] < 1:
+            raise CommandError("Нужен хотя бы один пользователь и пачка")
+        self.started = self.reported = time.perf_counter()
+        seeder = Seeder(
+            users=options["users"], posts=options["posts"],
+            groups=options["groups"], comments=options["comments"],
+            follows=options["follows"], skew=options["skew"],
+            days=options["days"], seed=options["seed"],
+            batch_size=options["batch_size"], timelines=options["timelines"],
+            images=options["images"], placeholders=options["placeholders"],
+            progress=self.progress
+        )
+        counts = seeder.run()
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(
+            "Готово за {:.1f} с: {}".format(elapsed, ", ".join(
+                f"{name} {number}" for name, number in counts.items()
+            ))
+        )
+
+    def progress(self, name, written):
+        # Не чаще раза в секунду: пачки на миллионах строк идут потоком
+        now = time.perf_counter()
+        if now - self.reported >= 1:
+            self.reported = now
+            self.stdout.write(
+                f"{name}: {written} строк, {now - self.started:.0f} с"
+            )
@@ -0,0 +1,316 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+
+from .clients import client_ip
+
+# Границы корзин гистограмм, как у клиентов Prometheus по умолчанию
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+lock = threading.Lock()
+current = threading.local()
+MISSING = object()
+
+
+def escape(value):
+    return (
+        str(value).replace("\\", "\\\\").replace("\n", "\\n")
+        .replace('"', '\\"')
+    )
+
+
+def format_labels(names, values, extra=""):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, description, labels=()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        with lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labels, labels)} {value}"
+
+
+class Histogram(Counter):
+    """Гистограмма Prometheus: корзины хранятся без накопления.
+
+    Последняя корзина - +Inf, за ней сумма наблюдений.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, description, labels=(), buckets=SECONDS):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        with lock:
+            row = self.values.get(labels)
+            if row is None:
+                row = self.values[labels] = [0] * (len(self.buckets) + 2)
+            row[bisect_left(self.buckets, value)] += 1
+            row[-1] += value
+
+    def samples(self):
+        for labels, row in sorted(self.values.items()):
+            total = 0
+            bounds = [*self.buckets, "+Inf"]
+            for bound, number in zip(bounds, row):
+                total += number
+                le = format_labels(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {total}"
+            plain = format_labels(self.labels, labels)
+            yield f"{self.name}_sum{plain} {row[-1]:.6f}"
+            yield f"{self.name}_count{plain} {total}"
+
+
+REQUEST_SECONDS = Histogram(
+    "yatube_request_duration_seconds", "Время ответа представления",
+    ("view",)
+)
+DB_QUERIES = Histogram(
+    "yatube_db_queries", "Запросов к базе за запрос", ("view",), QUERIES
+)
+DB_SECONDS = Histogram(
+    "yatube_db_duration_seconds", "Время запросов к базе за запрос",
+    ("view",)
+)
+TEMPLATE_SECONDS = Histogram(
+    "yatube_template_render_seconds", "Время рендеринга шаблонов за запрос",
+    ("view",)
+)
+CACHE_LOOKUPS = Counter(
+    "yatube_cache_lookups_total", "Чтения из кэша", ("view", "result")
+)
+THUMBNAIL_SECONDS = Histogram(
+    "yatube_thumbnail_seconds", "Время генерации одной миниатюры"
+)
+RATE_LIMIT_CHECKS = Counter(
+    "yatube_rate_limit_checks_total", "Проверки ограничений частоты",
+    ("rule", "result")
+)
+METRICS = (
+    REQUEST_SECONDS, DB_QUERIES, DB_SECONDS, TEMPLATE_SECONDS,
+    CACHE_LOOKUPS, THUMBNAIL_SECONDS, RATE_LIMIT_CHECKS,
+)
+
+
+def exposition():
+    """Все метрики процесса в текстовом формате Prometheus."""
+    lines = []
+    with lock:
+        for metric in METRICS:
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def metrics_view(request):
+    # За обратным прокси REMOTE_ADDR - адрес самого прокси, часто
+    # 127.0.0.1: сверяется адрес клиента, как в ограничениях частоты
+    if client_ip(request) not in settings.INTERNAL_IPS:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        exposition(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+class Timings:
+    """Замеры одного запроса; живут в current.timings его потока."""
+
+    def __init__(self):
+        # Запросы могут идти и из потоков concurrency.gather
+        self.lock = threading.Lock()
+        self.queries = 0
+        self.db = 0.0
+        self.template = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.thumbnails = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # Обёртка connection.execute_wrapper
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self.lock:
+                self.db += elapsed
+                self.queries += 1
+
+
+def timings():
+    return getattr(current, "timings", None)
+
+
+@contextmanager
+def recording(recorder):
+    """Запросы к базе и замеры текущего потока пишутся в recorder."""
+    if recorder is None:
+        yield
+        return
+    previous = timings()
+    current.timings = recorder
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            yield
+    finally:
+        current.timings = previous
+
+
+@contextmanager
+def timed(attr, histogram=None):
+    """Добавляет длительность блока к полю attr замеров запроса."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        recorder = timings()
+        if recorder is not None:
+            setattr(recorder, attr, getattr(recorder, attr) + elapsed)
+        if histogram is not None:
+            histogram.observe(elapsed)
+
+
+class MetricsMiddleware:
+    """Время, запросы к базе, шаблоны и кэш по имени представления.
+
+    Гистограммы копятся в памяти процесса и отдаются на /metrics;
+    при DEBUG и для персонала ответ получает заголовок Server-Timing.
+    Ставится вторым, сразу после ReplicaPinMiddleware, чтобы учесть
+    и ответы из кэша страниц.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = Timings()
+        start = time.perf_counter()
+        with recording(recorder):
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+        view = view_name(request)
+        REQUEST_SECONDS.observe(elapsed, view)
+        DB_QUERIES.observe(recorder.queries, view)
+        DB_SECONDS.observe(recorder.db, view)
+        TEMPLATE_SECONDS.observe(recorder.template, view)
+        if recorder.hits:
+            CACHE_LOOKUPS.inc(view, "hit", amount=recorder.hits)
+        if recorder.misses:
+            CACHE_LOOKUPS.inc(view, "miss", amount=recorder.misses)
+        user = getattr(request, "user", None)
+        if settings.DEBUG or (user is not None and user.is_staff):
+            response["Server-Timing"] = server_timing(recorder, elapsed)
+        return response
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        # Ответ из кэша страниц отдан до разбора URL
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return "<unresolved>"
+    return match.view_name
+
+
+def server_timing(recorder, elapsed):
+    return ", ".join([
+        f"total;dur={elapsed * 1000:.1f}",
+        f'db;dur={recorder.db * 1000:.1f};desc="{recorder.queries} queries"',
+        f"tpl;dur={recorder.template * 1000:.1f}",
+        f"thumb;dur={recorder.thumbnails * 1000:.1f}",
+        f'cache;desc="hit {recorder.hits}, miss {recorder.misses}"',
+    ])
+
+
+class Template:
+    def __init__(self, template):
+        self.template = template
+
+    @property
+    def origin(self):
+        return self.template.origin
+
+    def render(self, context=None, request=None):
+        with timed("template"):
+            return self.template.render(context, request)
+
+
+class TimedTemplates(DjangoTemplates):
+    """Шаблоны Django с замером времени рендеринга."""
+
+    def from_string(self, template_code):
+        return Template(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return Template(super().get_template(template_name))
+
+
+class CountingCache:
+    """Обёртка над любым бэкендом кэша: считает попадания и промахи.
+
+    Настоящий бэкенд описывается в OPTIONS так же, как в CACHES:
+    BACKEND, LOCATION, TIMEOUT, OPTIONS. Считаются get и get_many,
+    остальное передаётся бэкенду как есть.
+    """
+
+    def __init__(self, location, params):
+        inner = dict(params.get("OPTIONS", {}))
+        backend = import_string(inner.pop("BACKEND"))
+        self.cache = backend(inner.pop("LOCATION", location), inner)
+
+    def __getattr__(self, name):
+        if name == "cache":
+            # Ещё не создан (например, при копировании объекта)
+            raise AttributeError(name)
+        return getattr(self.cache, name)
+
+    def __contains__(self, key):
+        return key in self.cache
+
+    def count(self, hits, misses):
+        recorder = timings()
+        if recorder is not None:
+            recorder.hits += hits
+            recorder.misses += misses
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(key, MISSING, version)
+        self.count(value is not MISSING, value is MISSING)
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.cache.get_many(keys, version)
+        self.count(len(found), len(keys) - len(found))
+        return found
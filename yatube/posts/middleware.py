@@ -0,0 +1,92 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                set_response_etag)
+from django.utils.http import parse_http_date_safe
+
+from . import caching, routers
+
+
+class AnonymousCacheMiddleware:
+    """Кэш целых страниц для анонимных посетителей.
+
+    Кэшируются только ответы, которым представление выставило заголовок
+    Surrogate-Key. Вместе с ответом сохраняются версии его ключей;
+    caching.purge() меняет версию, и запись перестаёт совпадать.
+    Ставится после AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (request.method not in ("GET", "HEAD")
+                or request.user.is_authenticated):
+            return self.get_response(request)
+
+        key = caching.page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            versions, response = cached
+            if caching.get_versions(versions) == versions:
+                response["X-Cache"] = "HIT"
+                return self.conditional(request, response)
+
+        response = self.get_response(request)
+        if (response.status_code != 200 or response.streaming
+                or response.cookies or "Surrogate-Key" not in response):
+            return response
+        if not response.has_header("ETag"):
+            set_response_etag(response)
+        patch_cache_control(
+            response, public=True, max_age=settings.ANONYMOUS_CACHE_MAX_AGE
+        )
+        versions = caching.get_versions(response["Surrogate-Key"].split())
+        cache.set(
+            key, (versions, response), settings.ANONYMOUS_CACHE_TIMEOUT
+        )
+        response["X-Cache"] = "MISS"
+        return self.conditional(request, response)
+
+    def conditional(self, request, response):
+        last_modified = response.get("Last-Modified")
+        return get_conditional_response(
+            request, etag=response["ETag"],
+            last_modified=last_modified and parse_http_date_safe(
+                last_modified
+            ),
+            response=response
+        )
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes при чтении с реплик.
+
+    Запрос, который что-то записал, ставит cookie на
+    REPLICA_PIN_SECONDS, и пока она жива, все запросы этого клиента
+    читают из основной базы: реплика успевает догнать её.
+    Небезопасные методы читают из основной базы всегда.
+    Ставится первым, до сессий и аутентификации.
+    """
+
+    cookie_name = "pin_primary"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        routers.reset()
+        if (self.cookie_name in request.COOKIES
+                or request.method not in ("GET", "HEAD", "OPTIONS")):
+            routers.pin()
+        try:
+            response = self.get_response(request)
+            if routers.has_written() and settings.DATABASE_REPLICAS:
+                response.set_cookie(
+                    self.cookie_name, "1",
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite="Lax"
+                )
+            return response
+        finally:
+            routers.reset()
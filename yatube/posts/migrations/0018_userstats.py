@@ -0,0 +1,52 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    posts = Post.objects.using(db_alias)
+    follows = Follow.objects.using(db_alias)
+    counters = {
+        'posts_count': posts.values_list('author'),
+        'followers_count': follows.values_list('author'),
+        'follows_count': follows.values_list('user'),
+    }
+    stats = {
+        pk: UserStats(user_id=pk)
+        for pk in User.objects.using(db_alias).values_list('pk', flat=True)
+    }
+    for field, rows in counters.items():
+        for pk, number in rows.annotate(number=Count('pk')).order_by():
+            setattr(stats[pk], field, number)
+    UserStats.objects.using(db_alias).bulk_create(
+        stats.values(), batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0017_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Записей')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Подписчиков')),
+                ('follows_count', models.IntegerField(default=0, verbose_name='Подписок')),
+            ],
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:33
+
+from django.db import migrations, models
+from django.db.models import Count
+import posts.storage
+
+
+def fill_blobs(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Post = apps.get_model('posts', 'Post')
+    ImageBlob = apps.get_model('posts', 'ImageBlob')
+    rows = Post.objects.using(db_alias).exclude(image='').exclude(
+        image=None
+    ).values_list('image').annotate(refs=Count('pk')).order_by()
+    ImageBlob.objects.using(db_alias).bulk_create(
+        (ImageBlob(name=name, refs=refs) for name, refs in rows),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_postimagevariant'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBlob',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Файл')),
+                ('refs', models.IntegerField(default=0, verbose_name='Ссылок')),
+            ],
+        ),
+        # Хранилище не влияет на схему, а пересоздание posts_post
+        # в SQLite снесло бы триггеры полнотекстового индекса
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='post',
+                name='image',
+                field=models.ImageField(blank=True, help_text='Можете добавить изображение', null=True, storage=posts.storage.ContentAddressedStorage(), upload_to='posts/', verbose_name='Изображение'),
+            ),
+        ]),
+        migrations.RunPython(fill_blobs, migrations.RunPython.noop),
+    ]
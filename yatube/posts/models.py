@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import content_addressed_storage
+
 User = get_user_model()
 
 
@@ -34,6 +36,14 @@ class Group(models.Model):
         return self.title
 
 
+class PostQuerySet(models.QuerySet):
+    def with_related(self):
+        """Всё, что шаблон поста читает у связанных объектов."""
+        return self.select_related("author", "group").prefetch_related(
+            "image_variants"
+        )
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name="Текст публикации",
@@ -67,17 +77,69 @@ class Post(models.Model):
         verbose_name="Автор", help_text="Автор - это вы"
     )
     image = models.ImageField(
-        upload_to='posts/', verbose_name="Изображение", blank=True, null=True,
+        upload_to='posts/', storage=content_addressed_storage,
+        verbose_name="Изображение", blank=True, null=True,
         help_text="Можете добавить изображение"
     )
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ["-pub_date"]
+        # Ленты автора и группы: фильтр по ключу и сортировка как
+        # у CursorPaginator, без временного B-дерева
+        indexes = [
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_pub_date"
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_pub_date"
+            ),
+        ]
 
     def __str__(self):
         return self.text[:15]
 
 
+class ImageBlob(models.Model):
+    """Файл картинки, общий для всех постов с одинаковым содержимым."""
+
+    name = models.CharField("Файл", max_length=255, primary_key=True)
+    refs = models.IntegerField("Ссылок", default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class PostImageVariant(models.Model):
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="image_variants",
+        verbose_name="Пост"
+    )
+    source = models.CharField(
+        "Исходное изображение", max_length=255,
+        help_text="Имя файла Post.image, из которого сделан вариант"
+    )
+    file = models.ImageField("Файл", upload_to="posts/variants/")
+    format = models.CharField("Формат", max_length=10)
+    width = models.PositiveIntegerField("Ширина")
+    height = models.PositiveIntegerField("Высота")
+    size = models.PositiveIntegerField("Размер, байт")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post", "format", "width"],
+                name="unique_image_variant"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.format} {self.width}x{self.height}"
+
+
 class Comment(models.Model):
     post = models.ForeignKey(
         Post, on_delete=models.CASCADE, related_name="comments",
@@ -100,6 +162,11 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ["-created"]
+        indexes = [
+            models.Index(
+                fields=["post", "-created"], name="comment_post_created"
+            )
+        ]
 
     def __str__(self):
         return self.text[:15]
@@ -122,3 +189,50 @@ class Follow(models.Model):
                 fields=['user', 'author'], name='unique_following'
             )
         ]
+        # Обратный поиск подписчиков автора только по индексу
+        indexes = [
+            models.Index(fields=["author", "user"], name="follow_author_user")
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True,
+        related_name="stats", verbose_name="Пользователь"
+    )
+    posts_count = models.IntegerField("Записей", default=0)
+    followers_count = models.IntegerField("Подписчиков", default=0)
+    follows_count = models.IntegerField("Подписок", default=0)
+
+    def __str__(self):
+        return str(self.user_id)
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline",
+        verbose_name="Читатель",
+        help_text="Владелец ленты подписок"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries",
+        verbose_name="Пост", help_text="Пост автора, на которого подписан"
+    )
+    pub_date = models.DateTimeField(
+        "Дата публикации",
+        help_text="Копия даты публикации поста для сортировки ленты"
+    )
+
+    class Meta:
+        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_pub_date"
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry"
+            )
+        ]
@@ -0,0 +1,144 @@
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+COUNT_CACHE_TIMEOUT = 60
+
+
+def encode_cursor(key, pk):
+    """Ключ курсора - дата или число (например, ранг в поиске)."""
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    else:
+        key = repr(float(key))
+    return urlsafe_base64_encode(f"{key}|{pk}".encode())
+
+
+def decode_cursor(token):
+    """Возвращает (ключ, pk) или None для битого курсора."""
+    if not token:
+        return None
+    try:
+        key, pk = urlsafe_base64_decode(token).decode().split("|")
+        pk = int(pk)
+        value = parse_datetime(key)
+        if value is None:
+            value = float(key)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        return None
+    return value, pk
+
+
+def older_than(queryset, cursor, keys=("pub_date", "pk")):
+    """Строки строго старше курсора, от новых к старым."""
+    date_field, tie_field = keys
+    queryset = queryset.order_by(f"-{date_field}", f"-{tie_field}")
+    if cursor is None:
+        return queryset
+    pub_date, pk = cursor
+    return queryset.filter(
+        Q(**{f"{date_field}__lt": pub_date})
+        | Q(**{date_field: pub_date, f"{tie_field}__lt": pk})
+    )
+
+
+def newer_than(queryset, cursor, keys=("pub_date", "pk")):
+    """Строки строго новее курсора, от старых к новым."""
+    date_field, tie_field = keys
+    pub_date, pk = cursor
+    return queryset.order_by(date_field, tie_field).filter(
+        Q(**{f"{date_field}__gt": pub_date})
+        | Q(**{date_field: pub_date, f"{tie_field}__gt": pk})
+    )
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id) без OFFSET и COUNT(*).
+
+    Поля ключа можно переопределить через keys. Наследники могут
+    собирать строки не из одного queryset, переопределив fetch_older
+    и fetch_newer.
+
+    Страница всегда строится одним запросом на per_page + 1 строк:
+    лишняя строка говорит о том, есть ли записи дальше. Номер страницы
+    условный (1 или 2), его хватает, чтобы has_next/has_previous
+    стандартного Page работали как обычно.
+    """
+
+    key_type = datetime
+
+    def __init__(self, object_list, per_page, approximate_count=True,
+                 keys=("pub_date", "pk")):
+        super().__init__(object_list, per_page)
+        self.keys = keys
+        self.approximate_count = approximate_count
+        self.has_next = False
+        self.has_previous = False
+
+    @cached_property
+    def count(self):
+        if not self.approximate_count:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = "paginator_count:" + hashlib.md5(query).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, COUNT_CACHE_TIMEOUT)
+        return count
+
+    @property
+    def num_pages(self):
+        return 1 + self.has_previous + self.has_next
+
+    def fetch_older(self, cursor, limit):
+        return list(older_than(self.object_list, cursor, self.keys)[:limit])
+
+    def fetch_newer(self, cursor, limit):
+        return list(newer_than(self.object_list, cursor, self.keys)[:limit])
+
+    def get_page(self, after=None, before=None):
+        after = self.decode(after)
+        before = self.decode(before) if after is None else None
+        limit = self.per_page + 1
+        if before is not None:
+            rows = self.fetch_newer(before, limit)
+            self.has_next = True
+            self.has_previous = len(rows) == limit
+            rows = rows[:self.per_page][::-1]
+        else:
+            rows = self.fetch_older(after, limit)
+            self.has_next = len(rows) == limit
+            self.has_previous = after is not None
+            rows = rows[:self.per_page]
+        if not rows and (after or before):
+            return self.get_page()
+        page = Page(rows, 1 + self.has_previous, self)
+        page.next_cursor = (
+            self.cursor_for(rows[-1]) if self.has_next else None
+        )
+        page.previous_cursor = (
+            self.cursor_for(rows[0]) if self.has_previous else None
+        )
+        return page
+
+    def decode(self, token):
+        cursor = decode_cursor(token)
+        if cursor is None or not isinstance(cursor[0], self.key_type):
+            return None
+        return cursor
+
+    def cursor_for(self, row):
+        """row - объект модели или словарь из values()."""
+        date_field, tie_field = self.keys
+        if isinstance(row, dict):
+            return encode_cursor(row[date_field], row[tie_field])
+        return encode_cursor(
+            getattr(row, date_field), getattr(row, tie_field)
+        )
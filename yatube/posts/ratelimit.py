@@ -0,0 +1,120 @@
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from . import metrics
+from .clients import client_ip
+
+KEY = "ratelimit:{}:{}"
+
+lock = threading.Lock()
+
+
+def sliding_window(key, limit, period, now):
+    """Скользящее окно по счётчикам текущего и прошлого окна.
+
+    Прошлое окно входит в оценку с весом той его доли, что ещё
+    попадает в последние period секунд. Счётчик увеличивается атомарно
+    через cache.incr, отказы тоже считаются: долбящий клиент остаётся
+    за порогом. Возвращает 0 или сколько секунд ждать.
+    """
+    window = int(now // period)
+    elapsed = now - window * period
+    current_key = f"{key}:{window}"
+    cache.add(current_key, 0, period * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        # Ключ вытеснили между add и incr
+        cache.set(current_key, 1, period * 2)
+        current = 1
+    previous = cache.get(f"{key}:{window - 1}", 0)
+    if previous * (1 - elapsed / period) + current <= limit:
+        return 0
+    if current > limit:
+        return period - elapsed
+    # Когда вес прошлого окна опустится настолько, что запрос пройдёт
+    return period * (1 - (limit - current) / previous) - elapsed
+
+
+def token_bucket(key, limit, period, now):
+    """Ведро на limit жетонов, которое наполняется за period секунд.
+
+    Разрешает всплеск до limit запросов подряд, дальше - по одному
+    за period / limit секунд. Чтение и запись ведра не атомарны для
+    общего кэша: параллельные процессы могут изредка потратить один
+    жетон дважды, в пределах процесса их разделяет lock.
+    """
+    rate = limit / period
+    with lock:
+        tokens, updated = cache.get(key, (limit, now))
+        tokens = min(limit, tokens + (now - updated) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        # За period простоя ведро наполняется, запись больше не нужна
+        cache.set(key, (tokens, now), period)
+    return 0 if allowed else (1 - tokens) / rate
+
+
+ALGORITHMS = {
+    "sliding_window": sliding_window,
+    "token_bucket": token_bucket,
+}
+
+
+def identity(request, by):
+    user = getattr(request, "user", None)
+    if by == "user" and user is not None and user.is_authenticated:
+        return f"user-{user.pk}"
+    # Для анонимов ограничение по пользователю становится ограничением
+    # по адресу
+    return f"ip-{client_ip(request)}"
+
+
+def check(name, request, now=None):
+    """Учитывает запрос в правиле name из RATE_LIMITS.
+
+    Возвращает 0, если запрос разрешён, иначе секунды до повтора.
+    """
+    algorithm, limit, period, by = settings.RATE_LIMITS[name]
+    wait = ALGORITHMS[algorithm](
+        KEY.format(name, identity(request, by)), limit, period,
+        time.time() if now is None else now
+    )
+    metrics.RATE_LIMIT_CHECKS.inc(name, "rejected" if wait else "allowed")
+    return wait
+
+
+def too_many_requests(wait):
+    seconds = max(1, math.ceil(wait))
+    response = HttpResponse(
+        f"Слишком много запросов. Повторите через {seconds} с.",
+        status=429, content_type="text/plain; charset=utf-8"
+    )
+    response["Retry-After"] = str(seconds)
+    return response
+
+
+def limit(*names, methods=None):
+    """Декоратор представления: правила names из RATE_LIMITS.
+
+    Проверяются все правила сразу, ответ 429 с Retry-After - по самому
+    долгому ожиданию. methods - какие методы считать, None - все.
+    Ставится под login_required, чтобы не считать редиректы на вход.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if methods is None or request.method in methods:
+                wait = max(check(name, request) for name in names)
+                if wait:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = "default"
+
+state = threading.local()
+
+
+def is_pinned():
+    return getattr(state, "pinned", False)
+
+
+def has_written():
+    return getattr(state, "written", False)
+
+
+def pin():
+    """Все дальнейшие чтения потока идут в основную базу."""
+    state.pinned = True
+
+
+def record_write():
+    """Поток записал (или поставил в очередь записи) данные."""
+    pin()
+    state.written = True
+
+
+def reset():
+    state.pinned = False
+    state.written = False
+
+
+@contextmanager
+def use_primary():
+    pinned = is_pinned()
+    pin()
+    try:
+        yield
+    finally:
+        state.pinned = pinned
+
+
+class PrimaryReplicaRouter:
+    """Чтение с реплик из DATABASE_REPLICAS, запись в основную базу.
+
+    Первая же запись закрепляет поток за основной базой до reset():
+    иначе следующее чтение в том же запросе могло бы не увидеть
+    только что записанное. Между запросами закрепление переносит
+    ReplicaPinMiddleware.
+    """
+
+    def db_for_read(self, model, **hints):
+        if is_pinned() or not settings.DATABASE_REPLICAS:
+            return PRIMARY
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        record_write()
+        instance = hints.get("instance")
+        if (instance is not None
+                and instance._state.db not in settings.DATABASE_REPLICAS):
+            # Объект из другой базы (например, bench_sqlite) пишется туда же
+            return None
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        pool = {PRIMARY, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in pool and obj2._state.db in pool:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема на реплики приходит вместе с данными
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,108 @@
+import re
+
+from django.db import connection
+from django.utils.functional import cached_property
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .paginator import CursorPaginator, encode_cursor
+
+FTS_TABLE = "posts_post_fts"
+MARK_START, MARK_END = "\x02", "\x03"
+SNIPPET_TOKENS = 24
+
+
+def match_expression(query):
+    """Слова запроса как фразы FTS5: операторы пользователя не работают."""
+    return " ".join(f'"{word}"' for word in re.findall(r"\w+", query))
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet).replace(MARK_START, "<mark>")
+        .replace(MARK_END, "</mark>")
+    )
+
+
+class SearchPaginator(CursorPaginator):
+    """Результаты полнотекстового поиска по posts_post_fts.
+
+    Порядок - по рангу bm25 (в FTS5 меньше значит лучше), курсор -
+    пара (rank, id). Посты загружаются отдельным запросом вместе с
+    автором и группой, к каждому добавляются rank и snippet.
+    """
+
+    key_type = float
+
+    def __init__(self, query, per_page):
+        super().__init__(Post.objects.none(), per_page)
+        self.match = match_expression(query)
+
+    @cached_property
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s", [self.match]
+            )
+            return cursor.fetchone()[0]
+
+    def fetch_older(self, cursor, limit):
+        where, params = "", []
+        if cursor is not None:
+            where = "AND (rank > %s OR (rank = %s AND rowid > %s))"
+            params = [cursor[0], cursor[0], cursor[1]]
+        return self.fetch(where, params, "rank, rowid", limit)
+
+    def fetch_newer(self, cursor, limit):
+        where = "AND (rank < %s OR (rank = %s AND rowid < %s))"
+        params = [cursor[0], cursor[0], cursor[1]]
+        return self.fetch(where, params, "rank DESC, rowid DESC", limit)
+
+    def fetch(self, where, params, order_by, limit):
+        if not self.match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, rank, snippet({FTS_TABLE}, 0, %s, %s, "
+                f"'…', {SNIPPET_TOKENS}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s {where} "
+                f"ORDER BY {order_by} LIMIT %s",
+                [MARK_START, MARK_END, self.match, *params, limit]
+            )
+            rows = cursor.fetchall()
+        posts = Post.objects.with_related().in_bulk(
+            [pk for pk, _, _ in rows]
+        )
+        found = []
+        for pk, rank, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.rank = rank
+                post.snippet = highlight(snippet)
+                found.append(post)
+        return found
+
+    def cursor_for(self, post):
+        return encode_cursor(post.rank, post.pk)
+
+
+def filter_matching(queryset, query):
+    """Посты queryset, найденные по query, подзапросом к индексу.
+
+    id не выгружаются в Python: список из тысяч id упёрся бы в лимит
+    параметров запроса SQLite.
+    """
+    match = match_expression(query)
+    if not match:
+        return queryset.none()
+    return queryset.extra(
+        where=[
+            f"{Post._meta.db_table}.id IN (SELECT rowid FROM {FTS_TABLE} "
+            f"WHERE {FTS_TABLE} MATCH %s)"
+        ],
+        params=[match]
+    )
@@ -0,0 +1,329 @@
+import io
+import random
+from collections import Counter
+from datetime import timedelta
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models import DateTimeField
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from . import blobs
+from .importer import next_pk, reset_sequences
+from .models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                     UserStats)
+from .storage import content_addressed_storage
+
+PREFIX = "seed"
+# Один пароль на всех, чтобы под любым пользователем можно было войти
+PASSWORD = "seed-password"
+WORDS = (
+    "лето город море кофе книга дорога утро музыка кино друг работа "
+    "вечер снег река парк поезд дом кот история фото"
+).split()
+PLACEHOLDER_SIZE = (800, 600)
+
+
+class Table:
+    """Один INSERT на все столбцы модели для cursor.executemany.
+
+    Строки - словари attname -> значение; недостающие поля берут
+    значения по умолчанию модели. В обход экземпляров моделей и
+    компилятора запросов: на миллионах строк именно они, а не база,
+    съедают большую часть времени.
+    """
+
+    def __init__(self, model):
+        fields = model._meta.concrete_fields
+        self.defaults = {
+            field.attname: field.get_default() for field in fields
+        }
+        self.datetimes = [
+            field.attname for field in fields
+            if isinstance(field, DateTimeField)
+        ]
+        quote = connection.ops.quote_name
+        self.sql = "INSERT INTO {} ({}) VALUES ({})".format(
+            quote(model._meta.db_table),
+            ", ".join(quote(field.column) for field in fields),
+            ", ".join(["%s"] * len(fields)),
+        )
+
+    def values(self, row):
+        values = {**self.defaults, **row}
+        for name in self.datetimes:
+            values[name] = connection.ops.adapt_datetimefield_value(
+                values[name]
+            )
+        return tuple(values.values())
+
+    def insert(self, rows):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(self.sql, [self.values(row) for row in rows])
+
+
+def timeline_sql():
+    """INSERT ... SELECT лент читателей с id в [%s, %s).
+
+    Остальные параметры - порог подписчиков популярного автора и длина
+    ленты.
+    """
+    quote = connection.ops.quote_name
+    follow = quote(Follow._meta.db_table)
+    return f"""
+        INSERT INTO {quote(TimelineEntry._meta.db_table)}
+            (user_id, post_id, pub_date)
+        SELECT user_id, post_id, pub_date FROM (
+            SELECT follow.user_id, post.id AS post_id, post.pub_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY follow.user_id
+                    ORDER BY post.pub_date DESC, post.id DESC
+                ) AS position
+            FROM {follow} follow
+            JOIN {quote(Post._meta.db_table)} post
+                ON post.author_id = follow.author_id
+            WHERE follow.user_id >= %s AND follow.user_id < %s
+                AND follow.author_id NOT IN (
+                    SELECT author_id FROM {follow}
+                    GROUP BY author_id HAVING COUNT(*) >= %s
+                )
+        ) ranked
+        WHERE position <= %s
+    """
+
+
+class Seeder:
+    """Синтетические пользователи, группы, посты, комментарии, подписки.
+
+    Популярность авторов и у читателей, и по числу постов подчиняется
+    степенному закону с показателем skew: первые пользователи - звёзды
+    с тысячами подписчиков, хвост почти никому не интересен. Одинаковый
+    seed даёт одинаковые данные. Строки пишутся пачками по batch_size
+    одним INSERT на пачку с id, выделенными подряд, поэтому в памяти
+    не держатся ни строки, ни их id: хватает диапазонов и счётчиков
+    на пользователя.
+
+    images - доля постов с картинкой; картинки выбираются из
+    placeholders заглушек, сохранённых в общее хранилище.
+    progress(имя модели, записано строк) вызывается после каждой пачки.
+    """
+
+    def __init__(self, users=1000, posts=10000, groups=20, comments=3,
+                 follows=20, skew=1.2, days=365, seed=0, batch_size=1000,
+                 timelines=True, images=0, placeholders=20, progress=None):
+        self.users = users
+        self.posts = posts
+        self.groups = groups
+        self.comments = comments
+        self.follows = follows
+        self.skew = skew
+        self.days = days
+        self.batch_size = batch_size
+        self.timelines = timelines
+        self.images = images
+        self.placeholders = placeholders
+        self.progress = progress
+        self.random = random.Random(seed)
+        self.now = timezone.now()
+        self.counts = {}
+        self.stats = {
+            "posts_count": Counter(),
+            "followers_count": Counter(),
+            "follows_count": Counter(),
+        }
+
+    def run(self):
+        self.user_ids = self.seed_users()
+        self.group_ids = self.seed_groups()
+        # Накопленные веса степенного закона для random.choices
+        self.weights = list(accumulate(
+            1 / rank ** self.skew for rank in range(1, self.users + 1)
+        ))
+        self.image_names = self.seed_placeholders()
+        post_ids = self.seed_posts()
+        self.seed_comments(post_ids)
+        self.seed_follows()
+        self.seed_stats()
+        reset_sequences([User, Group, Post, Comment, Follow])
+        if self.timelines:
+            self.seed_timelines(self.user_ids)
+        return self.counts
+
+    def write(self, model, rows):
+        """Пишет строки-словари пачками; возвращает диапазон их id.
+
+        id выдаются подряд с MAX(id) + 1, если ключ модели автоматический.
+        """
+        table = Table(model)
+        first = next_pk(model)
+        pk = model._meta.pk.attname if model._meta.auto_field else None
+        count = 0
+        batch = []
+        for row in rows:
+            if pk is not None:
+                row[pk] = first + count + len(batch)
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                count += self.flush(model, table, batch, count)
+                batch = []
+        count += self.flush(model, table, batch, count)
+        self.counts[model._meta.model_name] = count
+        return range(first, first + count)
+
+    def flush(self, model, table, batch, written):
+        if batch:
+            table.insert(batch)
+            if self.progress is not None:
+                self.progress(model._meta.model_name, written + len(batch))
+        return len(batch)
+
+    def seed_users(self):
+        password = make_password(PASSWORD)
+        start = next_pk(User)
+        return self.write(User, (
+            {
+                "username": f"{PREFIX}{start + number}",
+                "password": password, "date_joined": self.now,
+            }
+            for number in range(self.users)
+        ))
+
+    def seed_groups(self):
+        start = next_pk(Group)
+        return self.write(Group, (
+            {
+                "title": f"Группа {start + number}",
+                "slug": f"{PREFIX}-{start + number}",
+                "description": self.text(12),
+            }
+            for number in range(self.groups)
+        ))
+
+    def seed_placeholders(self):
+        """Имена картинок-заглушек в хранилище постов."""
+        if not self.images:
+            return []
+        names = []
+        for number in range(self.placeholders):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            image = Image.new("RGB", PLACEHOLDER_SIZE, color)
+            ImageDraw.Draw(image).text((20, 20), str(number), fill="white")
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=85)
+            names.append(content_addressed_storage.save(
+                f"posts/{PREFIX}.jpg", ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def authors(self, count):
+        return self.random.choices(
+            self.user_ids, cum_weights=self.weights, k=count
+        )
+
+    def seed_posts(self):
+        references = Counter()
+
+        def rows():
+            for start in range(0, self.posts, self.batch_size):
+                count = min(self.batch_size, self.posts - start)
+                for author_id in self.authors(count):
+                    self.stats["posts_count"][author_id] += 1
+                    yield {
+                        "text": self.text(), "author_id": author_id,
+                        "group_id": self.group_id(), "pub_date": self.date(),
+                        "image": self.image(references),
+                    }
+        post_ids = self.write(Post, rows())
+        for name, number in references.items():
+            blobs.acquire(name, number)
+        return post_ids
+
+    def group_id(self):
+        if self.group_ids and self.random.random() < 0.5:
+            return self.random.choice(self.group_ids)
+        return None
+
+    def image(self, references):
+        if not self.image_names or self.random.random() >= self.images:
+            return ""
+        name = self.random.choice(self.image_names)
+        references[name] += 1
+        return name
+
+    def seed_comments(self, post_ids):
+        if not self.comments:
+            return
+        rate = 1 / self.comments
+        self.write(Comment, (
+            {
+                "post_id": post_id, "text": self.text(8),
+                "created": self.date(),
+                "author_id": self.random.choice(self.user_ids),
+            }
+            for post_id in post_ids
+            for _ in range(int(self.random.expovariate(rate)))
+        ))
+
+    def seed_follows(self):
+        """Подписки: сколько - случайно вокруг follows, на кого - по весам."""
+        def rows():
+            if not self.follows or len(self.user_ids) < 2:
+                return
+            rate = 1 / self.follows
+            for user_id in self.user_ids:
+                count = min(
+                    int(self.random.expovariate(rate)), len(self.user_ids) - 1
+                )
+                # sorted: порядок множества зависит от хэшей, а не от seed
+                for author_id in sorted(set(self.authors(count)) - {user_id}):
+                    self.stats["follows_count"][user_id] += 1
+                    self.stats["followers_count"][author_id] += 1
+                    yield {"user_id": user_id, "author_id": author_id}
+        return self.write(Follow, rows())
+
+    def seed_stats(self):
+        """Счётчики пользователей из подсчитанного при генерации."""
+        self.write(UserStats, (
+            {
+                "user_id": user_id,
+                **{
+                    field: counter[user_id]
+                    for field, counter in self.stats.items()
+                },
+            }
+            for user_id in self.user_ids
+        ))
+
+    def seed_timelines(self, user_ids):
+        """Ленты подписок одним INSERT ... SELECT на batch_size читателей.
+
+        Как timeline.backfill для каждой подписки, но без обхода пар в
+        Python: оконная функция оставляет каждому читателю
+        TIMELINE_LENGTH последних постов его авторов, кроме
+        популярных, чьи посты подмешиваются при чтении.
+        """
+        sql = timeline_sql()
+        count = 0
+        for start in range(user_ids.start, user_ids.stop, self.batch_size):
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(sql, [
+                    start, min(start + self.batch_size, user_ids.stop),
+                    settings.TIMELINE_CELEBRITY_FOLLOWERS,
+                    settings.TIMELINE_LENGTH,
+                ])
+                count += cursor.rowcount
+            if self.progress is not None:
+                self.progress(TimelineEntry._meta.model_name, count)
+        self.counts[TimelineEntry._meta.model_name] = count
+
+    def text(self, words=30):
+        return " ".join(self.random.choices(WORDS, k=words)).capitalize()
+
+    def date(self):
+        return self.now - timedelta(
+            seconds=self.random.randrange(self.days * 24 * 60 * 60)
+        )
@@ -0,0 +1,108 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, caching, images, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    for pragma, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f"PRAGMA {pragma} = {value}")
+
+
+@receiver(post_save, sender=User)
+def create_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def purge_post_pages(sender, instance, **kwargs):
+    caching.purge(*caching.post_keys(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def purge_group_pages(sender, instance, **kwargs):
+    caching.purge(f"group-{instance.pk}", caching.FEED)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_comment_pages(sender, instance, **kwargs):
+    caching.purge(f"post-{instance.post_id}")
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def purge_follow_pages(sender, instance, **kwargs):
+    caching.purge(
+        f"author-{instance.author_id}", f"author-{instance.user_id}"
+    )
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.author_id, posts_count=1)
+        timeline.push_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def queue_images(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name, pk = instance.image.name, instance.pk
+    if name:
+        transaction.on_commit(lambda: thumbnails.enqueue(name))
+    if name or not created:
+        transaction.on_commit(lambda: images.enqueue(pk))
+
+
+@receiver(post_delete, sender=Post)
+def forget_post(sender, instance, **kwargs):
+    stats.change(instance.author_id, posts_count=-1)
+    timeline.forget_post(instance)
+    blobs.release(instance.image.name)
+
+
+@receiver(pre_save, sender=Post)
+def remember_image(sender, instance, raw=False, **kwargs):
+    instance.previous_image = None
+    if instance.pk and not raw:
+        instance.previous_image = Post.objects.filter(
+            pk=instance.pk
+        ).values_list("image", flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def count_image_refs(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "previous_image", None) or ""
+    current = instance.image.name or ""
+    if previous != current:
+        blobs.acquire(current)
+        blobs.release(previous)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        stats.change(instance.user_id, follows_count=1)
+        stats.change(instance.author_id, followers_count=1)
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def purge_timeline(sender, instance, **kwargs):
+    stats.change(instance.user_id, follows_count=-1)
+    stats.change(instance.author_id, followers_count=-1)
+    timeline.purge(instance.user_id, instance.author_id)
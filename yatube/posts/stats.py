@@ -0,0 +1,66 @@
+from django.db.models import Count, F
+
+from .models import Follow, Post, User, UserStats
+
+COUNTERS = {
+    "posts_count": (Post, "author"),
+    "followers_count": (Follow, "author"),
+    "follows_count": (Follow, "user"),
+}
+
+
+def change(user_id, **deltas):
+    UserStats.objects.filter(user=user_id).update(**{
+        field: F(field) + delta for field, delta in deltas.items()
+    })
+
+
+def get_stats(user):
+    """Счётчики пользователя; недостающая строка считается на месте."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recompute([user.pk])[0]
+
+
+def count_by_user(user_ids=None):
+    counts = {}
+    for field, (model, owner) in COUNTERS.items():
+        rows = model.objects.all()
+        if user_ids is not None:
+            rows = rows.filter(**{f"{owner}__in": user_ids})
+        for user_id, number in rows.values_list(owner).annotate(
+            number=Count("pk")
+        ).order_by():
+            counts.setdefault(user_id, {})[field] = number
+    return counts
+
+
+def recompute(user_ids=None):
+    """Пересчитывает счётчики и чинит расхождения.
+
+    Возвращает список исправленных или созданных строк.
+    """
+    counts = count_by_user(user_ids)
+    users = User.objects.all()
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    existing = UserStats.objects.in_bulk(
+        user_ids if user_ids is not None else None
+    )
+    created, changed = [], []
+    for user_id in users.values_list("pk", flat=True).iterator():
+        actual = dict.fromkeys(COUNTERS, 0)
+        actual.update(counts.get(user_id, {}))
+        stats = existing.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **actual))
+        elif any(getattr(stats, f) != v for f, v in actual.items()):
+            for field, value in actual.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    UserStats.objects.bulk_create(
+        created, batch_size=500, ignore_conflicts=True
+    )
+    UserStats.objects.bulk_update(changed, list(COUNTERS), batch_size=500)
+    return created + changed
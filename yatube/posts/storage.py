@@ -0,0 +1,51 @@
+import hashlib
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def file_digest(content):
+    """sha256 файла: готовый из обработчика загрузки или посчитанный."""
+    digest = getattr(content, "sha256", None)
+    if digest is None:
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+    return digest
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит файл под именем из его sha256.
+
+    Одинаковые загрузки превращаются в один файл
+    posts/ab/cd/abcd....jpg: если он уже есть, save просто
+    возвращает его имя, а загруженная копия не сохраняется.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.blob_name(name, file_digest(content))
+        if self.exists(name):
+            return name
+        saved = super().save(name, content, max_length)
+        if saved != name:
+            # Тот же файл параллельно сохранил другой поток: копия не нужна
+            self.delete(saved)
+        return name
+
+    def blob_name(self, name, digest):
+        directory, filename = posixpath.split(name.replace("\\", "/"))
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(
+            directory, digest[:2], digest[2:4], digest + extension
+        )
+
+
+content_addressed_storage = ContentAddressedStorage()
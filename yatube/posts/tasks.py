@@ -0,0 +1,65 @@
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import routers
+
+logger = logging.getLogger(__name__)
+
+jobs = queue.Queue()
+pending = set()
+lock = threading.Lock()
+worker = None
+
+
+def submit(key, func, *args):
+    """Ставит func(*args) в фоновую очередь процесса.
+
+    Задача с тем же key, пока она ждёт выполнения, второй раз не
+    ставится. При BACKGROUND_TASKS_EAGER задача выполняется сразу
+    в вызывающем потоке, ошибка так же только пишется в лог.
+    """
+    global worker
+    if settings.BACKGROUND_TASKS_EAGER:
+        run(key, func, args)
+        return
+    with lock:
+        if key in pending:
+            return
+        pending.add(key)
+        if worker is None or not worker.is_alive():
+            worker = threading.Thread(
+                target=work, name="posts-tasks", daemon=True
+            )
+            worker.start()
+    jobs.put((key, func, args))
+
+
+def run(key, func, args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Фоновая задача %s завершилась ошибкой", key)
+
+
+def work():
+    while True:
+        key, func, args = jobs.get()
+        try:
+            # Задачи ставятся после коммита и должны видеть его сразу
+            with routers.use_primary():
+                run(key, func, args)
+        finally:
+            with lock:
+                pending.discard(key)
+            close_old_connections()
+            jobs.task_done()
+
+
+def wait():
+    """Ждёт, пока фоновая очередь опустеет (для команд manage.py)."""
+    if worker is not None:
+        jobs.join()
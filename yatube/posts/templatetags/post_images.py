@@ -0,0 +1,35 @@
+from django import template
+from django.templatetags.static import static
+
+from .. import images, thumbnails
+
+register = template.Library()
+
+PLACEHOLDER = "posts/placeholder.svg"
+
+
+@register.simple_tag
+def post_thumbnail(image, size="card", post=None):
+    """URL готовой миниатюры, иначе ставит её в очередь.
+
+    Пока миниатюры нет, отдаётся самый широкий готовый вариант
+    картинки post, а если нет и их - заглушка. Оригинал не отдаётся
+    никогда: он может весить мегабайты.
+    """
+    if not image:
+        return ""
+    url = thumbnails.cached_url(image, size)
+    if url:
+        return url
+    thumbnails.enqueue(image.name)
+    if post is not None:
+        url = images.largest_url(post)
+    return url or static(PLACEHOLDER)
+
+
+@register.inclusion_tag("includes/post_picture.html")
+def post_picture(post):
+    return {
+        "sources": images.picture_sources(post),
+        "fallback": post_thumbnail(post.image, post=post),
+    }
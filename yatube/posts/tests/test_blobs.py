@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import images
+from ..models import ImageBlob, Post
+from ..storage import content_addressed_storage
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(color='red'):
+    content = BytesIO()
+    Image.new('RGB', (600, 400), color).save(content, 'JPEG')
+    return SimpleUploadedFile(
+        'meme.jpg', content.getvalue(), content_type='image/jpeg'
+    )
+
+
+def run_on_commit(func):
+    func()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageBlobTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, image):
+        return Post.objects.create(
+            text='Мем', author=ImageBlobTests.user, image=image
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post(make_image())
+        second = self.create_post(make_image())
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refs, 2)
+        directory = os.path.dirname(first.image.path)
+        self.assertEqual(os.listdir(directory), [
+            os.path.basename(first.image.name)
+        ])
+
+    def test_precomputed_digest_is_used(self):
+        content = ContentFile(b'data', name='a.png')
+        content.sha256 = 'ab' * 32
+        name = content_addressed_storage.save('posts/a.png', content)
+        self.assertEqual(name, f'posts/ab/ab/{"ab" * 32}.png')
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_last_reference_removes_file(self):
+        first = self.create_post(make_image('blue'))
+        second = self.create_post(make_image('blue'))
+        path = first.image.path
+        with mock.patch('posts.blobs.transaction.on_commit', run_on_commit):
+            first.delete()
+            self.assertTrue(os.path.exists(path))
+            second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_replaced_image_is_released(self):
+        post = self.create_post(make_image('green'))
+        old_name = post.image.name
+        post.image = make_image('yellow')
+        post.save()
+        self.assertFalse(ImageBlob.objects.filter(name=old_name).exists())
+        self.assertEqual(ImageBlob.objects.get(name=post.image.name).refs, 1)
+
+    def test_variants_are_built_once_per_image(self):
+        first = self.create_post(make_image('white'))
+        second = self.create_post(make_image('white'))
+        images.build_variants(first.pk)
+        with mock.patch.object(images.Image, 'open') as image_open:
+            images.build_variants(second.pk)
+        image_open.assert_not_called()
+        self.assertEqual(
+            sorted(second.image_variants.values_list('file', flat=True)),
+            sorted(first.image_variants.values_list('file', flat=True))
+        )
@@ -0,0 +1,28 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import clients
+
+
+class ClientIpTests(SimpleTestCase):
+    def ip(self, remote_addr, forwarded=None):
+        headers = {'REMOTE_ADDR': remote_addr}
+        if forwarded is not None:
+            headers['HTTP_X_FORWARDED_FOR'] = forwarded
+        return clients.client_ip(RequestFactory().get('/', **headers))
+
+    def test_forwarded_for_ignored_without_trusted_proxy(self):
+        self.assertEqual(self.ip('203.0.113.5', '198.51.100.1'),
+                         '203.0.113.5')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8', '192.0.2.1'])
+    def test_forwarded_for_from_trusted_proxies(self):
+        self.assertEqual(self.ip('10.0.0.2', '198.51.100.1'),
+                         '198.51.100.1')
+        # Адрес, подставленный клиентом левее, не учитывается
+        self.assertEqual(
+            self.ip('10.0.0.2', '1.1.1.1, 198.51.100.1, 192.0.2.1'),
+            '198.51.100.1'
+        )
+        self.assertEqual(self.ip('10.0.0.2'), '10.0.0.2')
+        self.assertEqual(self.ip('203.0.113.5', '198.51.100.1'),
+                         '203.0.113.5')
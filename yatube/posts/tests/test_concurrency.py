@@ -0,0 +1,116 @@
+import asyncio
+import threading
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from yatube.asgi import application, build_environ
+
+from .. import concurrency, metrics, routers
+from ..models import Post, User
+
+
+class GatherTests(TestCase):
+    def test_sequential_in_transaction_and_for_one_worker(self):
+        self.assertFalse(concurrency.parallel_allowed())
+        with override_settings(QUERY_WORKERS=4), transaction.atomic():
+            self.assertFalse(concurrency.parallel_allowed())
+        self.assertEqual(concurrency.gather(lambda: 1, lambda: 2), [1, 2])
+
+    def test_runs_in_pool_with_request_context(self):
+        recorder = metrics.Timings()
+        seen = []
+
+        def probe():
+            seen.append((threading.current_thread().name,
+                         routers.is_pinned(), metrics.timings()))
+            return 'probe'
+
+        routers.pin()
+        self.addCleanup(routers.reset)
+        with mock.patch.object(concurrency, 'parallel_allowed',
+                               return_value=True), \
+                metrics.recording(recorder):
+            result = concurrency.gather(lambda: 'first', probe)
+        self.assertEqual(result, ['first', 'probe'])
+        name, pinned, timings = seen[0]
+        self.assertTrue(name.startswith('posts-queries'))
+        self.assertTrue(pinned)
+        self.assertIs(timings, recorder)
+
+    def test_post_view_renders_comments(self):
+        author = User.objects.create_user(username='Author')
+        post = Post.objects.create(text='Пост', author=author)
+        post.comments.create(author=author, text='Первый комментарий')
+        response = self.client.get(
+            reverse('posts:post_view', args=['Author', post.pk])
+        )
+        self.assertContains(response, 'Первый комментарий')
+        response = self.client.get(
+            reverse('posts:post_view', args=['Other', post.pk])
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+def request(path, method='GET', body=b'', headers=()):
+    """Прогоняет запрос через ASGI-приложение; (status, заголовки, тело)."""
+    messages = []
+    received = [{'type': 'http.request', 'body': body}]
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(application({
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': b'', 'headers': [(b'host', b'localhost'), *headers],
+        'server': ('localhost', 80), 'client': ('127.0.0.1', 1),
+    }, receive, send))
+    start = messages[0]
+    return (
+        start['status'], dict(start['headers']),
+        b''.join(message.get('body', b'') for message in messages[1:])
+    )
+
+
+class AsgiTests(TransactionTestCase):
+    def test_environ_from_scope(self):
+        environ = build_environ({
+            'method': 'POST', 'path': '/Пост/', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'text/plain'),
+                        (b'x-tag', b'a'), (b'x-tag', b'b')],
+        }, None)
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/Пост/'
+        )
+
+    def test_serves_pages(self):
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Пост через ASGI', author=author)
+        status, headers, body = request('/')
+        self.assertEqual(status, 200)
+        self.assertIn('Пост через ASGI', body.decode())
+        self.assertIn(b'text/html', headers[b'content-type'])
+        status, _, _ = request('/no-such-user/')
+        self.assertEqual(status, 404)
+
+    @override_settings(QUERY_WORKERS=1)
+    def test_bench_serving(self):
+        author = User.objects.create_user(username='Author')
+        Post.objects.create(text='Пост', author=author)
+        out = StringIO()
+        call_command(
+            'bench_serving', requests=6, concurrency=2, asgi_threads=2,
+            query_workers=[1], stdout=out
+        )
+        self.assertIn('asgi, QUERY_WORKERS=1', out.getvalue())
+        self.assertNotIn('ошибок 1', out.getvalue())
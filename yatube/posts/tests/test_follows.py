@@ -0,0 +1,129 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import OperationalError
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from .. import follows
+from ..models import Follow, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+@override_settings(FOLLOW_FLUSH_MS=200)
+class FollowBufferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.follow_url = reverse('posts:profile_follow', args=['Author'])
+        cls.unfollow_url = reverse('posts:profile_unfollow', args=['Author'])
+        cls.profile_url = reverse('posts:profile', args=['Author'])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(FollowBufferTests.reader)
+        # Буфер без таймера: запись только по явному flush()
+        patcher = mock.patch.object(follows, 'schedule')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(follows.pending.clear)
+        self.addCleanup(follows.attempts.clear)
+
+    def test_toggles_are_coalesced(self):
+        for url in (self.follow_url, self.unfollow_url, self.follow_url):
+            self.client.get(url)
+        self.assertFalse(Follow.objects.exists())
+        follows.flush()
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1
+        )
+        self.assertEqual(follows.pending, {})
+
+    def test_round_trip_writes_nothing(self):
+        self.client.get(self.follow_url)
+        self.client.get(self.unfollow_url)
+        with self.assertNumQueries(0):
+            follows.flush()
+        self.assertFalse(Follow.objects.exists())
+
+    def test_read_your_writes(self):
+        self.client.get(self.follow_url)
+        response = self.client.get(self.profile_url)
+        self.assertTrue(response.context['following'])
+        self.assertEqual(response.context['followers'], 1)
+        other = Client()
+        response = other.get(self.profile_url)
+        self.assertEqual(response.context['followers'], 0)
+
+    def test_follow_index_flushes_own_changes(self):
+        Post.objects.create(text='Пост автора', author=self.author)
+        self.client.get(self.follow_url)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Пост автора')
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader
+        ).exists())
+
+    def test_bad_pair_does_not_block_others(self):
+        follows.change(self.reader.pk, 10 ** 6, True)
+        self.client.get(self.follow_url)
+        follows.flush()
+        self.assertEqual(
+            list(Follow.objects.values_list('author', flat=True)),
+            [self.author.pk]
+        )
+        self.assertEqual(follows.pending, {})
+
+    def test_retries_are_limited(self):
+        self.client.get(self.follow_url)
+        with mock.patch.object(follows, 'apply',
+                               side_effect=OperationalError('locked')):
+            for _ in range(follows.FLUSH_ATTEMPTS - 1):
+                follows.flush()
+                self.assertEqual(len(follows.pending), 1)
+            follows.flush()
+        self.assertEqual(follows.pending, {})
+        self.assertEqual(follows.attempts, {})
+        self.assertFalse(Follow.objects.exists())
+
+    def test_exit_hook_logs_failure(self):
+        self.client.get(self.follow_url)
+        with mock.patch.object(User.objects, 'filter',
+                               side_effect=OperationalError('closed')), \
+                self.assertLogs('posts.follows', 'ERROR'):
+            follows.flush_at_exit()
+
+
+@override_settings(FOLLOW_FLUSH_MS=50)
+class FollowBufferTimerTests(TransactionTestCase):
+    """Буфер с настоящим таймером и записью из его потока."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='Reader')
+        self.author = User.objects.create_user(username='Author')
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.addCleanup(follows.flush)
+
+    def test_timer_writes_buffered_follow(self):
+        self.client.get(
+            reverse('posts:profile_follow', args=['Author'])
+        )
+        self.assertFalse(Follow.objects.exists())
+        timer = follows.timer
+        self.assertIsNotNone(timer)
+        timer.join(5)
+        self.assertFalse(timer.is_alive())
+        self.assertTrue(Follow.objects.filter(
+            user=self.reader, author=self.author
+        ).exists())
+        self.assertEqual(follows.pending, {})
+        self.assertIsNone(follows.timer)
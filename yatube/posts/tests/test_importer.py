@@ -0,0 +1,188 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from .. import importer
+from ..models import Comment, Follow, Group, ImageBlob, Post, TimelineEntry
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def run_on_commit(func):
+    func()
+
+
+def ndjson(*rows):
+    return [json.dumps(row, ensure_ascii=False) + '\n' for row in rows]
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImporterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='Author')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def run_import(self, lines, fmt='ndjson', **kwargs):
+        run = importer.Importer(**kwargs)
+        with mock.patch('posts.importer.transaction.on_commit',
+                        run_on_commit):
+            run.run(importer.read_rows(lines, fmt))
+        return run
+
+    def test_posts_and_comments_keep_dates_and_links(self):
+        run = self.run_import(ndjson(
+            {'ref': 'p1', 'text': 'Старый пост', 'author': 'Author',
+             'group': 'test-slug', 'pub_date': '2015-03-01T10:00:00Z'},
+            {'type': 'comment', 'post': 'p1', 'author': 'Reader',
+             'text': 'Комментарий', 'created': '2015-03-02T10:00:00Z'},
+        ), batch_size=1)
+        self.assertEqual(run.errors, [])
+        post = Post.objects.get(text='Старый пост')
+        self.assertEqual(
+            post.pub_date, datetime(2015, 3, 1, 10, tzinfo=timezone.utc)
+        )
+        self.assertEqual(post.group, ImporterTests.group)
+        comment = post.comments.get()
+        self.assertEqual(comment.author, ImporterTests.reader)
+        self.assertEqual(comment.created.year, 2015)
+
+    def test_side_effects_of_signals(self):
+        with mock.patch('posts.importer.timeline.backfill',
+                        wraps=importer.timeline.backfill) as backfill:
+            self.run_import(ndjson(
+                *({'text': f'Пост {i}', 'author': 'Author'} for i in range(5))
+            ), batch_size=2)
+        # Ленты дозаполняются один раз за импорт, а не на каждую пачку
+        backfill.assert_called_once_with(
+            ImporterTests.reader.pk, ImporterTests.author.pk
+        )
+        ImporterTests.author.stats.refresh_from_db()
+        self.assertEqual(ImporterTests.author.stats.posts_count, 5)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=ImporterTests.reader).count(),
+            5
+        )
+        post = Post.objects.create(text='Новый', author=ImporterTests.author)
+        self.assertGreater(post.pk, Post.objects.exclude(pk=post.pk).latest(
+            'pk'
+        ).pk)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        lines = ndjson(
+            {'text': 'Хороший', 'author': 'Author'},
+            {'text': 'Без автора', 'author': 'Nobody'},
+            {'text': 'Без группы', 'author': 'Author', 'group': 'none'},
+            {'type': 'comment', 'post': 'missing', 'author': 'Author',
+             'text': 'Куда?'},
+            {'text': 'Нет такой даты', 'author': 'Author',
+             'pub_date': '2020-02-30T10:00:00'},
+            {'text': 'Автор не строка', 'author': ['Author']},
+            {'text': 'Группа не строка', 'author': 'Author',
+             'group': {'slug': 'test-slug'}},
+        ) + ['{битая строка\n']
+        run = self.run_import(lines)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(
+            sorted(line for line, _ in run.errors), [2, 3, 4, 5, 6, 7, 8]
+        )
+
+    def test_csv_with_images(self):
+        root = tempfile.mkdtemp(dir=settings.MEDIA_ROOT)
+        for name in ('a.png', 'b.png'):
+            Image.new('RGB', (40, 30), 'red').save(os.path.join(root, name))
+        lines = [
+            'text,author,image\n',
+            'Первый,Author,a.png\n',
+            'Второй,Author,b.png\n',
+            'Третий,Author,../../etc/passwd\n',
+        ]
+        with override_settings(BACKGROUND_TASKS_EAGER=True):
+            run = self.run_import(lines, 'csv', images_root=root)
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(ImageBlob.objects.get(name=names.pop()).refs, 2)
+        self.assertEqual([line for line, _ in run.errors], [3])
+
+    def test_command_reports_progress(self):
+        path = os.path.join(settings.MEDIA_ROOT, 'posts.ndjson')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.writelines(ndjson(
+                *({'text': f'Пост {i}', 'author': 'Author'} for i in range(3))
+            ))
+        out = StringIO()
+        call_command('import_posts', path, batch_size=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[-1].startswith('Готово: постов 3'))
+
+    def test_locked_database_is_reported(self):
+        with mock.patch.object(importer, 'next_pk',
+                               side_effect=OperationalError('locked')):
+            run = self.run_import(ndjson({'text': 'Пост', 'author': 'Author'}))
+        self.assertFalse(Post.objects.exists())
+        self.assertEqual(run.errors, [(1, 'пачка не записана: locked')])
+
+    def test_image_urls_only_from_allowed_hosts(self):
+        content = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(content, 'PNG')
+        response = mock.MagicMock(headers={})
+        response.__enter__.return_value = response
+        response.read.side_effect = [content.getvalue(), b'']
+        opener = mock.Mock(**{'open.return_value': response})
+        with mock.patch.object(importer, 'build_opener',
+                               return_value=opener):
+            denied = importer.Importer().store_image(
+                'http://127.0.0.1/a.png'
+            )
+            allowed = importer.Importer(
+                image_hosts=['images.example.com']
+            ).store_image('https://images.example.com/a.png')
+        self.assertIn('не разрешён', str(denied))
+        opener.open.assert_called_once()
+        self.assertTrue(allowed.startswith('posts/'))
+        handler = importer.AllowedHostsRedirectHandler(['images.example.com'])
+        with self.assertRaises(ValueError):
+            handler.redirect_request(
+                None, None, 302, 'Found', {}, 'http://169.254.169.254/'
+            )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_image_download_is_capped(self):
+        response = mock.MagicMock(headers={'Content-Length': '4096'})
+        response.__enter__.return_value = response
+        opener = mock.Mock(**{'open.return_value': response})
+        with mock.patch.object(importer, 'build_opener',
+                               return_value=opener):
+            error = importer.Importer(image_hosts=None).store_image(
+                'http://images.example.com/big.png'
+            )
+        self.assertIn('больше допустимого размера', str(error))
+        response.read.assert_not_called()
@@ -0,0 +1,107 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics
+from ..models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.create(text='Тестовый текст', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def count(self, histogram, view):
+        row = histogram.values.get((view,))
+        return sum(row[:-1]) if row else 0
+
+    @override_settings(DEBUG=True)
+    def test_request_is_recorded_per_view(self):
+        before = self.count(metrics.REQUEST_SECONDS, 'posts:index')
+        response = self.guest.get(reverse('posts:index'))
+        self.assertEqual(
+            self.count(metrics.REQUEST_SECONDS, 'posts:index'), before + 1
+        )
+        timing = response['Server-Timing']
+        for name in ('total;dur=', 'db;dur=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(name, timing)
+        self.assertNotIn('tpl;dur=0.0,', timing)
+
+    def test_cache_hits_and_misses(self):
+        url = reverse('posts:profile', kwargs={'username': 'TestUser'})
+        self.guest.get(url)
+        hits = metrics.CACHE_LOOKUPS.values.get(('posts:profile', 'hit'), 0)
+        self.guest.get(url)
+        self.assertGreater(
+            metrics.CACHE_LOOKUPS.values[('posts:profile', 'hit')], hits
+        )
+        self.assertIn(('posts:profile', 'miss'), metrics.CACHE_LOOKUPS.values)
+
+    def test_counting_cache_wraps_any_backend(self):
+        backend = metrics.CountingCache('', {'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'counting-test',
+        }})
+        backend.set('a', 1)
+        recorder = metrics.Timings()
+        with metrics.recording(recorder):
+            self.assertEqual(backend.get_many(['a', 'b']), {'a': 1})
+            self.assertEqual(backend.get('b', 'default'), 'default')
+            self.assertIn('a', backend)
+        self.assertEqual((recorder.hits, recorder.misses), (1, 2))
+        dummy = metrics.CountingCache('', {'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }})
+        dummy.set('a', 1)
+        self.assertIsNone(dummy.get('a'))
+
+    @override_settings(DEBUG=False)
+    def test_server_timing_only_for_staff_in_production(self):
+        response = self.guest.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_metrics_endpoint(self):
+        self.guest.get(reverse('posts:index'))
+        response = self.guest.get(reverse('metrics'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"}', text
+        )
+        self.assertIn('yatube_db_queries_count{view="posts:index"}', text)
+        response = self.guest.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(TRUSTED_PROXIES=['127.0.0.1'])
+    def test_metrics_behind_proxy_checks_client(self):
+        # Прокси на той же машине пересылает запрос внешнего клиента
+        response = self.guest.get(
+            reverse('metrics'), HTTP_X_FORWARDED_FOR='203.0.113.5'
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.guest.get(
+            reverse('metrics'), HTTP_X_FORWARDED_FOR='127.0.0.1'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = metrics.Histogram('test', 'Тест', buckets=(1, 2))
+        for value in (0.5, 1.5, 3):
+            histogram.observe(value)
+        self.assertEqual(list(histogram.samples()), [
+            'test_bucket{le="1"} 1',
+            'test_bucket{le="2"} 2',
+            'test_bucket{le="+Inf"} 3',
+            'test_sum 5.000000',
+            'test_count 3',
+        ])
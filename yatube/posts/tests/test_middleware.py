@@ -0,0 +1,134 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AnonymousCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='-'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст', author=cls.user, group=cls.group
+        )
+        cls.post_url = reverse('posts:post_view', kwargs={
+            'username': 'TestUser', 'post_id': cls.post.pk
+        })
+        cls.profile_url = reverse(
+            'posts:profile', kwargs={'username': 'TestUser'}
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+
+    def test_second_request_is_served_from_cache(self):
+        first = self.guest.get(AnonymousCacheTests.post_url)
+        second = self.guest.get(AnonymousCacheTests.post_url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        self.assertIn('public', second['Cache-Control'])
+        self.assertIn(f'post-{AnonymousCacheTests.post.pk}',
+                      second['Surrogate-Key'])
+
+    def test_logged_in_user_is_not_cached(self):
+        client = Client()
+        client.force_login(AnonymousCacheTests.reader)
+        client.get(AnonymousCacheTests.post_url)
+        response = client.get(AnonymousCacheTests.post_url)
+        self.assertNotIn('X-Cache', response)
+
+    def test_etag_gives_not_modified(self):
+        first = self.guest.get(AnonymousCacheTests.post_url)
+        response = self.guest.get(
+            AnonymousCacheTests.post_url, HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_writes_purge_tagged_pages(self):
+        writes = {
+            'комментарий': lambda: Comment.objects.create(
+                text='Новый комментарий', author=AnonymousCacheTests.reader,
+                post=AnonymousCacheTests.post
+            ),
+            'подписка': lambda: Follow.objects.create(
+                user=AnonymousCacheTests.reader,
+                author=AnonymousCacheTests.user
+            ),
+            'пост': lambda: Post.objects.create(
+                text='Ещё пост', author=AnonymousCacheTests.user
+            ),
+        }
+        for name, write in writes.items():
+            with self.subTest(write=name):
+                self.guest.get(AnonymousCacheTests.post_url)
+                self.guest.get(AnonymousCacheTests.profile_url)
+                write()
+                post_page = self.guest.get(AnonymousCacheTests.post_url)
+                profile = self.guest.get(AnonymousCacheTests.profile_url)
+                self.assertEqual(post_page['X-Cache'], 'MISS')
+                self.assertEqual(profile['X-Cache'], 'MISS')
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.post = Post.objects.create(text='Тестовый текст', author=cls.user)
+        cls.post_url = reverse('posts:post_view', kwargs={
+            'username': 'TestUser', 'post_id': cls.post.pk
+        })
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.auth_user = Client()
+        self.auth_user.force_login(ConditionalGetTests.user)
+
+    def test_matching_etag_skips_rendering(self):
+        etag = self.auth_user.get(ConditionalGetTests.post_url)['ETag']
+        response = self.auth_user.get(
+            ConditionalGetTests.post_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+
+    def test_etag_changes_after_comment(self):
+        etag = self.auth_user.get(ConditionalGetTests.post_url)['ETag']
+        Comment.objects.create(
+            text='Комментарий', author=ConditionalGetTests.user,
+            post=ConditionalGetTests.post
+        )
+        response = self.auth_user.get(
+            ConditionalGetTests.post_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_between_users(self):
+        etag = self.guest.get(ConditionalGetTests.post_url)['ETag']
+        response = self.auth_user.get(
+            ConditionalGetTests.post_url, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since_for_guests(self):
+        response = self.guest.get(ConditionalGetTests.post_url)
+        self.assertNotIn('Last-Modified', self.auth_user.get(
+            ConditionalGetTests.post_url
+        ))
+        response = self.guest.get(
+            ConditionalGetTests.post_url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 304)
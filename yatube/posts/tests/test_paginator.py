@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..paginator import CursorPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user) for i in range(25)
+        )
+        cls.index_url = reverse('posts:index')
+
+    def setUp(self):
+        self.guest = Client()
+        cache.clear()
+
+    def test_cursor_roundtrip(self):
+        post = Post.objects.first()
+        token = encode_cursor(post.pub_date, post.pk)
+        self.assertEqual(decode_cursor(token), (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('мусор'))
+
+    def test_walk_forward_and_back(self):
+        expected = list(Post.objects.order_by('-pub_date', '-pk'))
+        first = CursorPaginator(Post.objects.all(), 10).get_page()
+        second = CursorPaginator(Post.objects.all(), 10).get_page(
+            after=first.next_cursor
+        )
+        third = CursorPaginator(Post.objects.all(), 10).get_page(
+            after=second.next_cursor
+        )
+        self.assertEqual(list(first), expected[:10])
+        self.assertEqual(list(second), expected[10:20])
+        self.assertEqual(list(third), expected[20:])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(second.has_previous() and second.has_next())
+        self.assertFalse(third.has_next())
+        back = CursorPaginator(Post.objects.all(), 10).get_page(
+            before=third.previous_cursor
+        )
+        self.assertEqual(list(back), expected[10:20])
+        self.assertTrue(back.has_previous())
+
+    def test_bad_cursor_gives_first_page(self):
+        response = self.guest.get(self.index_url, {'after': 'мусор'})
+        self.assertFalse(response.context['page'].has_previous())
+        self.assertEqual(len(response.context['page']), 10)
+
+    def test_first_page_has_no_count_query(self):
+        with self.assertNumQueries(1):
+            page = CursorPaginator(Post.objects.all(), 10).get_page()
+            self.assertTrue(page.has_next())
+
+    def test_approximate_count_is_cached(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 25)
+        Post.objects.create(text='Ещё один', author=CursorPaginatorTests.user)
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, 25)
@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Сколько запросов к базе может сделать страница. Число не должно
+# зависеть от количества постов и комментариев на ней.
+QUERY_BUDGET = {
+    'posts:index': 4,
+    'posts:group': 5,
+    'posts:profile': 7,
+    'posts:post_view': 6,
+    'posts:follow_index': 6,
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test-slug', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        cls.urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group': reverse(
+                'posts:group', kwargs={'slug': 'test-slug'}
+            ),
+            'posts:profile': reverse(
+                'posts:profile', kwargs={'username': 'Author'}
+            ),
+            'posts:post_view': reverse('posts:post_view', kwargs={
+                'username': 'Author', 'post_id': cls.post.pk
+            }),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+
+    def setUp(self):
+        self.guest = Client()
+        self.auth_user = Client()
+        self.auth_user.force_login(QueryBudgetTests.reader)
+
+    def add_rows(self, number):
+        start = Comment.objects.count()
+        for i in range(start, start + number):
+            commenter = User.objects.create_user(username=f'Commenter{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group-{i}', description='-'
+            )
+            Post.objects.create(
+                text=f'Пост {i}', author=QueryBudgetTests.author,
+                group=QueryBudgetTests.group if i % 2 else group
+            )
+            Comment.objects.create(
+                text='Комментарий', author=commenter,
+                post=QueryBudgetTests.post
+            )
+
+    def count_queries(self, client, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            client.get(url)
+        return len(context.captured_queries)
+
+    def test_queries_within_budget(self):
+        for client in (self.guest, self.auth_user):
+            self.add_rows(2)
+            few = {
+                name: self.count_queries(client, url)
+                for name, url in QueryBudgetTests.urls.items()
+            }
+            self.add_rows(10)
+            for name, url in QueryBudgetTests.urls.items():
+                if client is self.guest and name == 'posts:follow_index':
+                    continue
+                with self.subTest(name=name, guest=client is self.guest):
+                    many = self.count_queries(client, url)
+                    self.assertEqual(many, few[name])
+                    self.assertLessEqual(many, QUERY_BUDGET[name])
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_queries_use_indexes(self):
+        self.add_rows(3)
+        for client in (self.guest, self.auth_user):
+            for name, url in QueryBudgetTests.urls.items():
+                cache.clear()
+                with CaptureQueriesContext(connection) as context:
+                    client.get(url)
+                for query in context.captured_queries:
+                    if not query['sql'].startswith('SELECT'):
+                        continue
+                    plan = self.query_plan(query['sql'])
+                    with self.subTest(name=name, sql=query['sql']):
+                        for step in plan:
+                            self.assertNotIn('TEMP B-TREE', step)
+                            if step.startswith('SCAN'):
+                                self.assertIn(' USING ', step)
@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import metrics, ratelimit
+from ..models import Post
+
+User = get_user_model()
+
+
+class AlgorithmTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_sliding_window(self):
+        waits = [
+            ratelimit.sliding_window('key', 3, 60, 600 + second)
+            for second in range(4)
+        ]
+        self.assertEqual(waits[:3], [0, 0, 0])
+        self.assertEqual(waits[3], 57)
+        # Через полокна прошлое окно весит половину: 4 * 0.5 + 1 <= 3
+        self.assertEqual(ratelimit.sliding_window('key', 3, 60, 690), 0)
+        self.assertGreater(ratelimit.sliding_window('key', 3, 60, 690), 0)
+
+    def test_token_bucket(self):
+        waits = [ratelimit.token_bucket('key', 2, 10, 100) for _ in range(3)]
+        self.assertEqual(waits[:2], [0, 0])
+        self.assertAlmostEqual(waits[2], 5)
+        self.assertEqual(ratelimit.token_bucket('key', 2, 10, 105), 0)
+        self.assertGreater(ratelimit.token_bucket('key', 2, 10, 105), 0)
+
+
+@override_settings(RATE_LIMITS={
+    'new_post': ('token_bucket', 2, 60, 'user'),
+    'add_comment': ('token_bucket', 2, 60, 'user'),
+    'follow': ('sliding_window', 2, 60, 'user'),
+    'signup': ('sliding_window', 1, 3600, 'ip'),
+    'write_ip': ('sliding_window', 100, 60, 'ip'),
+})
+class RateLimitedViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='Writer')
+        cls.other = User.objects.create_user(username='Other')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(RateLimitedViewsTests.user)
+
+    def test_new_post_returns_429(self):
+        url = reverse('posts:new_post')
+        rejected = metrics.RATE_LIMIT_CHECKS.values.get(
+            ('new_post', 'rejected'), 0
+        )
+        for number in range(2):
+            self.client.post(url, {'text': f'Пост {number}'})
+        response = self.client.post(url, {'text': 'Лишний пост'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(
+            metrics.RATE_LIMIT_CHECKS.values[('new_post', 'rejected')],
+            rejected + 1
+        )
+        # Форму можно открывать сколько угодно, лимит у других свой
+        self.assertEqual(self.client.get(url).status_code, 200)
+        other = Client()
+        other.force_login(RateLimitedViewsTests.other)
+        response = other.post(url, {'text': 'Пост другого'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_follow_toggles_are_limited(self):
+        url = reverse('posts:profile_follow', args=['Other'])
+        statuses = [self.client.get(url).status_code for _ in range(3)]
+        self.assertEqual(statuses, [302, 302, 429])
+
+    def test_signup_limited_by_ip(self):
+        url = reverse('signup')
+        guest = Client()
+        guest.post(url, {'username': 'first'})
+        response = guest.post(url, {'username': 'second'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(guest.get(url).status_code, 200)
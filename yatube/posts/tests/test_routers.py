@@ -0,0 +1,63 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from .. import routers
+from ..middleware import ReplicaPinMiddleware
+from ..models import Post
+
+router = routers.PrimaryReplicaRouter()
+
+
+def read_view(request):
+    return HttpResponse(router.db_for_read(Post))
+
+
+def write_view(request):
+    router.db_for_write(Post)
+    return HttpResponse(router.db_for_read(Post))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        routers.reset()
+        self.factory = RequestFactory()
+
+    def tearDown(self):
+        routers.reset()
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_reads_primary(self):
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_write_pins_thread_to_primary(self):
+        self.assertEqual(router.db_for_read(Post), 'replica')
+        self.assertEqual(router.db_for_write(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_use_primary(self):
+        with routers.use_primary():
+            self.assertEqual(router.db_for_read(Post), 'default')
+        self.assertEqual(router.db_for_read(Post), 'replica')
+
+    def test_write_sets_pin_cookie(self):
+        middleware = ReplicaPinMiddleware(write_view)
+        response = middleware(self.factory.get('/'))
+        cookie = response.cookies[ReplicaPinMiddleware.cookie_name]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertFalse(routers.is_pinned())
+
+    def test_read_only_request_uses_replica(self):
+        response = ReplicaPinMiddleware(read_view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica')
+        self.assertFalse(response.cookies)
+
+    def test_pinned_client_reads_primary(self):
+        request = self.factory.get('/')
+        request.COOKIES[ReplicaPinMiddleware.cookie_name] = '1'
+        response = ReplicaPinMiddleware(read_view)(request)
+        self.assertEqual(response.content, b'default')
+
+    def test_unsafe_method_reads_primary(self):
+        response = ReplicaPinMiddleware(read_view)(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Post
+from ..search import SearchPaginator, filter_matching
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.cat = Post.objects.create(
+            text='Кошка <b>спит</b> на окне', author=cls.user
+        )
+        cls.cats = Post.objects.create(
+            text='Кошка гоняет кошку, кошка довольна', author=cls.user
+        )
+        cls.dog = Post.objects.create(text='Собака лает', author=cls.user)
+        cls.search_url = reverse('posts:search')
+
+    def setUp(self):
+        self.guest = Client()
+
+    def test_search_finds_ranked_posts(self):
+        response = self.guest.get(SearchTests.search_url, {'q': 'кошка'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            list(response.context['page']),
+            [SearchTests.cats, SearchTests.cat]
+        )
+
+    def test_snippet_is_highlighted_and_escaped(self):
+        response = self.guest.get(SearchTests.search_url, {'q': 'спит'})
+        self.assertContains(response, '<mark>спит</mark>')
+        self.assertContains(response, '&lt;b&gt;')
+
+    def test_index_follows_edits_and_deletes(self):
+        SearchTests.dog.text = 'Собака спит'
+        SearchTests.dog.save()
+        self.assertIn(SearchTests.dog, filter_matching(Post.objects, 'спит'))
+        self.assertNotIn(
+            SearchTests.dog, filter_matching(Post.objects, 'лает')
+        )
+        Post.objects.filter(pk=SearchTests.dog.pk).delete()
+        self.assertNotIn(
+            SearchTests.dog, filter_matching(Post.objects, 'спит')
+        )
+
+    def test_bulk_created_posts_are_indexed(self):
+        Post.objects.bulk_create(
+            Post(text=f'Попугай номер {i}', author=SearchTests.user)
+            for i in range(25)
+        )
+        first = SearchPaginator('попугай', 10).get_page()
+        second = SearchPaginator('попугай', 10).get_page(
+            after=first.next_cursor
+        )
+        third = SearchPaginator('попугай', 10).get_page(
+            after=second.next_cursor
+        )
+        back = SearchPaginator('попугай', 10).get_page(
+            before=third.previous_cursor
+        )
+        seen = [post.pk for page in (first, second, third) for post in page]
+        self.assertEqual(len(set(seen)), 25)
+        self.assertEqual(list(back), list(second))
+        self.assertEqual(first.paginator.count, 25)
+
+    def test_query_syntax_is_not_interpreted(self):
+        response = self.guest.get(SearchTests.search_url, {'q': '"( OR *'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page']), 0)
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='admin'
+        )
+        self.guest.force_login(admin)
+        response = self.guest.get(
+            reverse('admin:posts_post_changelist'), {'q': 'кошка'}
+        )
+        self.assertEqual(
+            set(response.context['cl'].result_list),
+            {SearchTests.cat, SearchTests.cats}
+        )
+        response = self.guest.get(
+            reverse('admin:posts_post_changelist'), {'q': '*'}
+        )
+        self.assertEqual(response.context['cl'].result_count, 0)
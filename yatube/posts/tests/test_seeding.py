@@ -0,0 +1,209 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+
+from .. import follows, stats, timeline
+from ..models import (
+    Comment, Follow, ImageBlob, Post, TimelineEntry, UserStats
+)
+from ..seeding import Seeder
+
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+class SeederTests(TestCase):
+    def test_counts_and_skew(self):
+        counts = Seeder(users=50, posts=300, groups=3, follows=5).run()
+        self.assertEqual(counts['user'], 50)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(counts['comment'], Comment.objects.count())
+        followers = list(Follow.objects.values('author').annotate(
+            number=Count('pk')
+        ).order_by('-number').values_list('number', flat=True))
+        self.assertGreater(followers[0], 4 * followers[len(followers) // 2])
+        self.assertEqual(
+            sum(UserStats.objects.values_list('posts_count', flat=True)), 300
+        )
+        self.assertTrue(TimelineEntry.objects.exists())
+
+    def test_same_seed_gives_same_data(self):
+        Seeder(users=10, posts=30, seed=7).run()
+        first = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username'
+        ))
+        Post.objects.all().delete()
+        Seeder(users=10, posts=30, seed=7).run()
+        second = list(Post.objects.order_by('pk').values_list(
+            'text', 'author__username'
+        ))
+        self.assertEqual([text for text, _ in first],
+                         [text for text, _ in second])
+
+    def test_counters_match_rows(self):
+        Seeder(users=30, posts=200, follows=4, batch_size=7).run()
+        self.assertEqual(UserStats.objects.count(), 30)
+        self.assertEqual(stats.recompute(), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class SeedCommandTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_placeholder_images_and_no_timelines(self):
+        out = StringIO()
+        call_command(
+            'seed_yatube', '--no-timelines', users=20, posts=100, groups=2,
+            follows=3, images=0.5, placeholders=3, stdout=out
+        )
+        self.assertIn('Готово', out.getvalue())
+        with_images = Post.objects.exclude(image='')
+        self.assertTrue(0 < with_images.count() < 100)
+        self.assertEqual(
+            with_images.values('image').distinct().count(), 3
+        )
+        self.assertEqual(
+            sum(ImageBlob.objects.values_list('refs', flat=True)),
+            with_images.count()
+        )
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_rejects_bad_image_share(self):
+        with self.assertRaises(CommandError):
+            call_command('seed_yatube', images=2, stdout=StringIO())
+
+
+class BenchViewsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_saves_and_compares_baseline(self):
+        Seeder(users=20, posts=60, groups=2, follows=3).run()
+        path = os.path.join(self.directory, 'baseline.json')
+        out = StringIO()
+        cache.set('site-key', 'value')
+        call_command(
+            'bench_views', existing=True, requests=3, warmup=1, save=path,
+            stdout=out
+        )
+        # Бенчмарк работает в своём кэше и не стирает кэш сайта
+        self.assertEqual(cache.get('site-key'), 'value')
+        with open(path, encoding='utf-8') as file:
+            report = json.load(file)
+        self.assertIn('posts:post_view', report['results'])
+        for result in report['results'].values():
+            self.assertEqual(result['errors'], 0)
+        report['results']['posts:index']['queries'] = -1
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(report, file)
+        with self.assertRaisesMessage(CommandError, 'posts:index'):
+            call_command(
+                'bench_views', existing=True, requests=3, warmup=1,
+                views=['posts:index'], compare=path, stdout=out
+            )
+
+    @override_settings(RATE_LIMITS={
+        'new_post': ('token_bucket', 1, 60, 'user'),
+        'write_ip': ('sliding_window', 1, 60, 'ip'),
+    })
+    def test_write_scenarios_are_not_throttled(self):
+        Seeder(users=20, posts=60, groups=2, follows=3).run()
+        path = os.path.join(self.directory, 'writes.json')
+        call_command(
+            'bench_views', existing=True, requests=5, warmup=1,
+            views=['posts:new_post'], save=path, stdout=StringIO()
+        )
+        with open(path, encoding='utf-8') as file:
+            result = json.load(file)['results']['posts:new_post']
+        self.assertEqual(result['requests'], 5)
+        self.assertEqual(result['errors'], 0)
+        self.assertEqual(result['throttled'], 0)
+
+    def test_throttled_run_fails(self):
+        Seeder(users=20, posts=60, groups=2, follows=3).run()
+        path = os.path.join(self.directory, 'throttled.json')
+        with mock.patch('posts.ratelimit.check', return_value=5):
+            with self.assertRaisesMessage(CommandError, 'posts:new_post'):
+                call_command(
+                    'bench_views', existing=True, requests=3, warmup=1,
+                    views=['posts:new_post'], save=path, stdout=StringIO()
+                )
+        # Недействительный замер не сохраняется как образец
+        self.assertFalse(os.path.exists(path))
+
+    def test_guest_pages_bypass_page_cache(self):
+        Seeder(users=20, posts=60, groups=2, follows=3).run()
+        queries = {}
+        for with_cache in (False, True):
+            path = os.path.join(self.directory, f'{with_cache}.json')
+            call_command(
+                'bench_views', existing=True, requests=3, warmup=1,
+                views=['posts:index'], with_cache=with_cache, save=path,
+                stdout=StringIO()
+            )
+            with open(path, encoding='utf-8') as file:
+                result = json.load(file)['results']['posts:index']
+            queries[with_cache] = result['queries']
+        self.assertGreater(queries[False], 0)
+        self.assertEqual(queries[True], 0)
+
+    @override_settings(FOLLOW_FLUSH_MS=200)
+    @mock.patch('posts.management.commands.bench_views.connections')
+    @mock.patch('posts.management.commands.bench_views.Seeder')
+    @mock.patch.object(connection.creation, 'destroy_test_db')
+    @mock.patch.object(connection.creation, 'create_test_db')
+    @mock.patch.object(follows, 'schedule')
+    def test_follow_buffer_is_flushed_before_temporary_db_is_gone(
+        self, schedule, create_test_db, destroy_test_db, *mocks
+    ):
+        Seeder(users=20, posts=60, groups=2, follows=3).run()
+        self.addCleanup(follows.pending.clear)
+        destroy_test_db.side_effect = (
+            lambda *args, **kwargs: self.assertEqual(follows.pending, {})
+        )
+        call_command(
+            'bench_views', requests=2, warmup=0,
+            views=['posts:profile_follow'], stdout=StringIO()
+        )
+        self.assertTrue(schedule.called)
+        destroy_test_db.assert_called_once()
+
+
+class SeedTimelinesTests(TestCase):
+    @override_settings(
+        TIMELINE_LENGTH=5, TIMELINE_CELEBRITY_FOLLOWERS=8,
+        BACKGROUND_TASKS_EAGER=True
+    )
+    def test_timelines_match_backfill(self):
+        Seeder(users=30, posts=300, follows=4, batch_size=7).run()
+        seeded = {
+            user: list(TimelineEntry.objects.filter(user=user).order_by(
+                '-pub_date', '-post'
+            ).values_list('post', flat=True))
+            for user in Follow.objects.values_list('user', flat=True)
+        }
+        TimelineEntry.objects.all().delete()
+        cache.clear()
+        for user, author in Follow.objects.values_list('user', 'author'):
+            timeline.backfill(user, author)
+        for user, posts in seeded.items():
+            self.assertEqual(posts, list(TimelineEntry.objects.filter(
+                user=user
+            ).order_by('-pub_date', '-post').values_list('post', flat=True)))
+        self.assertTrue(any(seeded.values()))
@@ -0,0 +1,73 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+        cls.author = User.objects.create_user(username='Author')
+        cls.profile_url = reverse(
+            'posts:profile', kwargs={'username': 'Author'}
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(UserStatsTests.user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='Текст', author=UserStatsTests.author)
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'Author'}
+        ))
+        author = UserStats.objects.get(user=UserStatsTests.author)
+        reader = UserStats.objects.get(user=UserStatsTests.user)
+        self.assertEqual(author.posts_count, 1)
+        self.assertEqual(author.followers_count, 1)
+        self.assertEqual(reader.follows_count, 1)
+        post.delete()
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}
+        ))
+        author.refresh_from_db()
+        reader.refresh_from_db()
+        self.assertEqual(author.posts_count, 0)
+        self.assertEqual(author.followers_count, 0)
+        self.assertEqual(reader.follows_count, 0)
+
+    def test_profile_reads_counters(self):
+        Post.objects.create(text='Текст', author=UserStatsTests.author)
+        UserStats.objects.filter(user=UserStatsTests.author).update(
+            followers_count=42
+        )
+        response = self.client.get(UserStatsTests.profile_url)
+        self.assertEqual(response.context['num_of_posts'], 1)
+        self.assertEqual(response.context['followers'], 42)
+
+    def test_repair_command_fixes_drift(self):
+        Post.objects.bulk_create(
+            Post(text='Без сигналов', author=UserStatsTests.author)
+            for _ in range(3)
+        )
+        Follow.objects.bulk_create([
+            Follow(user=UserStatsTests.user, author=UserStatsTests.author)
+        ])
+        UserStats.objects.filter(user=UserStatsTests.user).delete()
+        out = StringIO()
+        call_command('repair_user_stats', stdout=out)
+        self.assertIn('2', out.getvalue())
+        author = UserStats.objects.get(user=UserStatsTests.author)
+        reader = UserStats.objects.get(user=UserStatsTests.user)
+        self.assertEqual(
+            (author.posts_count, author.followers_count), (3, 1)
+        )
+        self.assertEqual(reader.follows_count, 1)
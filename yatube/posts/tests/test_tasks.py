@@ -0,0 +1,32 @@
+import threading
+
+from django.test import TransactionTestCase, override_settings
+
+from .. import tasks
+from ..models import Group
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=False)
+class TaskQueueTests(TransactionTestCase):
+    """Очередь с рабочим потоком, как в production."""
+
+    def test_task_runs_in_worker_thread(self):
+        threads = []
+
+        def create_group(slug):
+            threads.append(threading.current_thread().name)
+            Group.objects.create(title=slug, slug=slug)
+
+        tasks.submit('group', create_group, 'first')
+        tasks.wait()
+        self.assertEqual(threads, ['posts-tasks'])
+        self.assertTrue(Group.objects.filter(slug='first').exists())
+
+    def test_failed_task_is_logged(self):
+        done = []
+        with self.assertLogs('posts.tasks', 'ERROR'):
+            tasks.submit('broken', lambda: 1 / 0)
+            tasks.submit('next', done.append, 'next')
+            tasks.wait()
+        self.assertEqual(done, ['next'])
+        self.assertEqual(tasks.pending, set())
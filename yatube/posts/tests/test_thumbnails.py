@@ -0,0 +1,115 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import Post, PostImageVariant
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image():
+    content = BytesIO()
+    Image.new('RGB', (1200, 800), 'red').save(content, 'JPEG')
+    return SimpleUploadedFile(
+        'big.jpg', content.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.post = Post.objects.create(
+            text='С картинкой', author=ThumbnailTests.user, image=make_image()
+        )
+        self.url = reverse('posts:post_view', kwargs={
+            'username': 'TestUser', 'post_id': self.post.pk
+        })
+
+    def test_page_does_not_generate_thumbnail(self):
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            response = self.guest.get(self.url)
+        enqueue.assert_called_once_with(self.post.image.name)
+        self.assertContains(response, 'src="/static/posts/placeholder.svg"')
+        self.assertNotContains(response, self.post.image.url)
+        self.assertIsNone(thumbnails.cached_url(self.post.image, 'card'))
+
+    def test_largest_ready_variant_while_thumbnail_is_missing(self):
+        images.build_variants(self.post.pk)
+        variant = PostImageVariant.objects.get(
+            post=self.post, format='JPEG', width=960
+        )
+        with mock.patch.object(thumbnails, 'enqueue'):
+            response = self.guest.get(self.url)
+        self.assertContains(response, f'src="{variant.file.url}"')
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_generated_thumbnail_is_used(self):
+        thumbnails.enqueue(self.post.image.name)
+        url = thumbnails.cached_url(self.post.image, 'card')
+        self.assertIsNotNone(url)
+        self.assertNotEqual(url, self.post.image.url)
+        response = self.guest.get(self.url)
+        self.assertContains(response, url)
+
+    def test_variants_are_built_and_used_in_srcset(self):
+        images.build_variants(self.post.pk)
+        variants = PostImageVariant.objects.filter(post=self.post)
+        formats = set(variants.values_list('format', flat=True))
+        self.assertIn('JPEG', formats)
+        self.assertIn('WEBP', formats)
+        self.assertEqual(
+            set(variants.values_list('width', flat=True)), {480, 960}
+        )
+        variant = variants.get(format='JPEG', width=960)
+        self.assertEqual((variant.height, variant.size > 0), (350, True))
+        response = self.guest.get(self.url)
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, f'{variant.file.url} 960w')
+
+    def test_new_image_replaces_variants(self):
+        images.build_variants(self.post.pk)
+        self.post.image = make_image()
+        self.post.save()
+        images.build_variants(self.post.pk)
+        sources = set(PostImageVariant.objects.filter(
+            post=self.post
+        ).values_list('source', flat=True))
+        self.assertEqual(sources, {self.post.image.name})
+
+    def test_cached_pages_are_purged_when_images_are_ready(self):
+        with mock.patch.object(thumbnails, 'enqueue'):
+            first = self.guest.get(self.url)
+            self.assertEqual(self.guest.get(self.url)['X-Cache'], 'HIT')
+        self.assertContains(first, 'placeholder.svg')
+        thumbnails.generate(self.post.image.name)
+        images.build_variants(self.post.pk)
+        response = self.guest.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['X-Cache'], 'HIT')
+        self.assertContains(
+            response, thumbnails.cached_url(self.post.image, 'card')
+        )
+        self.assertContains(response, '<source type="image/webp"')
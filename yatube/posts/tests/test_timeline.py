@@ -0,0 +1,142 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+# Множество популярных авторов пересчитывает фоновая задача: её поток
+# не видит данных теста, пока транзакция TestCase не закоммичена
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='Reader')
+        cls.author = User.objects.create_user(username='Author')
+        cls.old_post = Post.objects.create(text='Старый', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(TimelineTests.reader)
+
+    def follow(self):
+        self.client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'Author'}
+        ))
+
+    def test_follow_backfills_timeline(self):
+        self.follow()
+        entries = TimelineEntry.objects.filter(user=TimelineTests.reader)
+        self.assertEqual(
+            list(entries.values_list('post', flat=True)),
+            [TimelineTests.old_post.pk]
+        )
+
+    def test_new_post_is_pushed_to_followers(self):
+        self.follow()
+        post = Post.objects.create(text='Новый', author=TimelineTests.author)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page']), [post, TimelineTests.old_post]
+        )
+
+    def test_unfollow_purges_timeline(self):
+        self.follow()
+        self.client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'Author'}
+        ))
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTests.reader).exists()
+        )
+
+    @override_settings(TIMELINE_LENGTH=3)
+    def test_timeline_is_trimmed(self):
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=TimelineTests.author)
+            for i in range(5)
+        ]
+        entries = TimelineEntry.objects.filter(user=TimelineTests.reader)
+        self.assertEqual(
+            list(entries.values_list('post', flat=True)),
+            [post.pk for post in posts[:-4:-1]]
+        )
+
+    @override_settings(TIMELINE_LENGTH=2)
+    def test_push_trims_all_followers_in_one_query(self):
+        User.objects.bulk_create(
+            User(username=f'Reader{i}') for i in range(10)
+        )
+        readers = User.objects.filter(username__startswith='Reader')
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=TimelineTests.author)
+            for reader in readers
+        )
+        posts = [
+            Post.objects.create(text=f'Пост {i}', author=TimelineTests.author)
+            for i in range(3)
+        ]
+        # Подписчики, вставка и обрезка - без запроса на подписчика
+        with self.assertNumQueries(3):
+            timeline.push_post(posts[-1])
+        for reader in readers:
+            self.assertEqual(
+                list(reader.timeline.values_list('post', flat=True)),
+                [posts[2].pk, posts[1].pk]
+            )
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_celebrity_posts_are_pulled(self):
+        self.follow()
+        post = Post.objects.create(text='Новый', author=TimelineTests.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            list(response.context['page']), [post, TimelineTests.old_post]
+        )
+
+    @override_settings(TIMELINE_CACHE_TIMEOUT=0)
+    def test_demoted_author_is_pushed_to_followers(self):
+        with override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1):
+            self.follow()
+            post = Post.objects.create(
+                text='Новый', author=TimelineTests.author
+            )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertTrue(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(
+            list(response.context['page']), [post, TimelineTests.old_post]
+        )
+
+    def test_request_path_only_reads_cached_set(self):
+        with mock.patch.object(timeline.tasks, 'submit') as submit, \
+                self.assertNumQueries(0):
+            self.assertEqual(timeline.celebrity_ids(), set())
+        submit.assert_called_once_with(
+            timeline.CELEBRITIES_KEY, timeline.refresh_celebrities
+        )
+
+    @override_settings(TIMELINE_CELEBRITY_FOLLOWERS=1)
+    def test_refresh_command(self):
+        Follow.objects.create(
+            user=TimelineTests.reader, author=TimelineTests.author
+        )
+        out = StringIO()
+        call_command('refresh_celebrities', stdout=out)
+        self.assertEqual(out.getvalue(), 'Популярных авторов: 1\n')
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                timeline.celebrity_ids(), {TimelineTests.author.pk}
+            )
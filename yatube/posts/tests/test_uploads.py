@@ -0,0 +1,139 @@
+import os
+import shutil
+import struct
+import tempfile
+import zlib
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post
+from .. import uploads
+from ..uploads import TEMP_DIR
+
+User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def png_header(width, height):
+    """Сигнатура, IHDR и начало IDAT без пиксельных данных."""
+    data = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    chunk = b'IHDR' + data
+    return (b'\x89PNG\r\n\x1a\n' + struct.pack('>I', len(data)) + chunk
+            + struct.pack('>I', zlib.crc32(chunk))
+            + struct.pack('>I', 0) + b'IDAT')
+
+
+def upload(content, name='image.png'):
+    return SimpleUploadedFile(name, content, content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='TestUser')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ImageUploadTests.user)
+        self.url = reverse('posts:new_post')
+
+    def post_image(self, image):
+        return self.client.post(
+            self.url, {'text': 'С картинкой', 'image': image}
+        )
+
+    def test_valid_image_is_moved_into_media(self):
+        content = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(content, 'PNG')
+        response = self.post_image(upload(content.getvalue()))
+        self.assertRedirects(response, reverse('posts:index'))
+        post = Post.objects.get()
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(os.listdir(
+            os.path.join(settings.MEDIA_ROOT, TEMP_DIR)
+        ), [])
+
+    def test_too_many_pixels_rejected_by_header(self):
+        response = self.post_image(upload(png_header(10000, 10000)))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Изображение 10000x10000 слишком большое.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_decompression_bomb_rejected(self):
+        response = self.post_image(upload(png_header(100000, 100000)))
+        self.assertFormError(
+            response, 'form', 'image', 'Слишком большое изображение.'
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIZE=1024)
+    def test_oversized_file_rejected(self):
+        response = self.post_image(
+            upload(png_header(10, 10) + b'\0' * 2048)
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ.'
+        )
+
+    def test_not_image_rejected(self):
+        response = self.post_image(upload(b'not an image', 'image.txt'))
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertIn('image', response.context['form'].errors)
+        self.assertFalse(Post.objects.exists())
+
+    def test_read_header_with_pillow_7_open(self):
+        open_image = Image.open
+
+        def pillow_7_open(fp, mode='r'):
+            return open_image(fp, mode)
+
+        content = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(content, 'PNG')
+        bmp = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(bmp, 'BMP')
+        with mock.patch.object(uploads.Image, 'open', pillow_7_open):
+            self.assertEqual(
+                uploads.read_header(content.getvalue()), ('PNG', (40, 30))
+            )
+            self.assertIsNone(uploads.read_header(bmp.getvalue()))
+            self.assertIsNone(uploads.read_header(b'not an image'))
+
+    def test_admin_adds_post_with_author(self):
+        admin = User.objects.create_superuser(
+            username='Admin', email='admin@example.com', password='admin'
+        )
+        self.client.force_login(admin)
+        url = reverse('admin:posts_post_add')
+        content = BytesIO()
+        Image.new('RGB', (40, 30), 'red').save(content, 'PNG')
+        response = self.client.post(url, {
+            'text': 'Из админки', 'author': ImageUploadTests.user.pk,
+            'image': upload(content.getvalue()),
+        })
+        self.assertEqual(response.status_code, 302)
+        post = Post.objects.get()
+        self.assertEqual(post.author, ImageUploadTests.user)
+        self.assertTrue(os.path.exists(post.image.path))
+        response = self.client.post(url, {
+            'text': 'Не картинка', 'author': ImageUploadTests.user.pk,
+            'image': upload(png_header(10000, 10000)),
+        })
+        self.assertEqual(
+            response.context['adminform'].form.errors['image'],
+            ['Изображение 10000x10000 слишком большое.']
+        )
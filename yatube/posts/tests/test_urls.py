@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import Client, TestCase
 
 from ..models import Group, Post
@@ -43,6 +44,7 @@ class StaticURLTests(TestCase):
         self.auth_user.force_login(StaticURLTests.user)
         self.auth_not_author = Client()
         self.auth_not_author.force_login(StaticURLTests.not_author)
+        cache.clear()
 
     def test_public_pages(self):
         """Страницы, доступные всем"""
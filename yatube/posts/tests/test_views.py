@@ -13,9 +13,10 @@ from django.urls import reverse
 from ..models import Follow, Group, Post
 
 User = get_user_model()
+MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
 class ViewsTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -93,7 +94,7 @@ class ViewsTests(TestCase):
     @classmethod
     def tearDownClass(cls):
         super().tearDownClass()
-        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
         self.guest = Client()
@@ -223,12 +224,28 @@ class ViewsTests(TestCase):
         self.assertEqual(post, ViewsTests.author_post)
 
     def test_cache(self):
-        self.auth_user.get(ViewsTests.index_url)
+        response = self.auth_user.get(ViewsTests.index_url)
+        key = make_template_fragment_key('index_page', [
+            response.context['feed_generation'], '', '', ViewsTests.user.pk
+        ])
+        self.assertIsNotNone(cache.get(key))
         form_data = {
             'text': 'New',
         }
         self.auth_user.post(reverse('posts:post_edit', kwargs={
             'username': 'TestUser', 'post_id': 1
         }), data=form_data, follow=True)
-        key = make_template_fragment_key('index_page')
-        self.assertIsNotNone(cache.get(key))
+        response = self.auth_user.get(ViewsTests.index_url)
+        self.assertContains(response, 'New')
+
+    def test_cache_depends_on_page(self):
+        Post.objects.bulk_create(
+            Post(author=ViewsTests.user, text=f'Пост {i}') for i in range(12)
+        )
+        first = self.guest.get(ViewsTests.index_url)
+        second = self.guest.get(
+            ViewsTests.index_url,
+            {'after': first.context['page'].next_cursor}
+        )
+        self.assertNotContains(first, 'Пост 0')
+        self.assertContains(second, 'Пост 0')
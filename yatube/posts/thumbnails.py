@@ -0,0 +1,70 @@
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from . import caching, metrics, tasks
+from .models import Post
+from .storage import content_addressed_storage
+
+# Все размеры, которые используют шаблоны: имя -> (геометрия, опции)
+SIZES = {
+    "card": ("960x350", {"crop": "60% top", "upscale": True}),
+}
+
+
+class PostThumbnailBackend(ThumbnailBackend):
+    def get_cached_thumbnail(self, file_, geometry_string, **options):
+        """Миниатюра из KV-хранилища sorl без генерации или None."""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault("format", self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+    def _create_thumbnail(self, *args, **kwargs):
+        with metrics.timed("thumbnails", metrics.THUMBNAIL_SECONDS):
+            return super()._create_thumbnail(*args, **kwargs)
+
+
+backend = PostThumbnailBackend()
+
+
+def source(name):
+    return ImageFile(name, content_addressed_storage)
+
+
+def generate(name):
+    """Создаёт все размеры и сбрасывает кэш постов с этой картинкой.
+
+    До этого страницы отдавали заглушку и закэшировали её вместе
+    с собой.
+    """
+    for geometry, options in SIZES.values():
+        backend.get_thumbnail(source(name), geometry, **options)
+    caching.purge_posts(
+        Post.objects.filter(image=name).only("pk", "author", "group")
+    )
+
+
+def cached_url(image, size):
+    geometry, options = SIZES[size]
+    thumbnail = backend.get_cached_thumbnail(image, geometry, **options)
+    return thumbnail and thumbnail.url
+
+
+def enqueue(name):
+    """Ставит генерацию всех размеров изображения в фоновую очередь."""
+    tasks.submit(f"thumbnails:{name}", generate, name)
+
+
+def delete(name):
+    """Удаляет исходный файл вместе со всеми его миниатюрами."""
+    backend.delete(source(name))
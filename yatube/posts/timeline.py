@@ -0,0 +1,219 @@
+import heapq
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.utils.functional import cached_property
+
+from . import tasks
+from .models import Follow, Post, TimelineEntry
+from .paginator import CursorPaginator, encode_cursor, newer_than, older_than
+
+CELEBRITIES_KEY = "timeline:celebrities"
+RECENT_KEY = "timeline:recent:{}"
+
+
+def celebrity_ids():
+    """Авторы, чьи посты не рассылаются, а подмешиваются при чтении.
+
+    Множество только читается из кэша. Пересчитывает его команда
+    refresh_celebrities по расписанию, а если в кэше его нет или оно
+    старше TIMELINE_CACHE_TIMEOUT секунд - фоновая задача; пока она
+    не выполнится, действует прежнее множество.
+    """
+    cached = cache.get(CELEBRITIES_KEY)
+    if cached is None or cached[0] <= time.time():
+        tasks.submit(CELEBRITIES_KEY, refresh_celebrities)
+        # При BACKGROUND_TASKS_EAGER множество уже пересчитано
+        cached = cache.get(CELEBRITIES_KEY, cached)
+    return set() if cached is None else cached[1]
+
+
+def refresh_celebrities():
+    """Пересчитывает популярных авторов по всей таблице подписок.
+
+    Авторам, выпавшим из множества, ленты подписчиков дозаполняются.
+    """
+    cached = cache.get(CELEBRITIES_KEY)
+    ids = set(
+        Follow.objects.values("author").annotate(
+            followers=Count("pk")
+        ).filter(
+            followers__gte=settings.TIMELINE_CELEBRITY_FOLLOWERS
+        ).values_list("author", flat=True)
+    )
+    expires = time.time() + settings.TIMELINE_CACHE_TIMEOUT
+    cache.set(CELEBRITIES_KEY, (expires, ids), None)
+    if cached is not None:
+        for author_id in cached[1] - ids:
+            for user_id in Follow.objects.filter(
+                author=author_id
+            ).values_list("user_id", flat=True).iterator():
+                fill(user_id, author_id)
+    return ids
+
+
+def recent_posts(author_ids):
+    """Ключи (pub_date, pk) последних постов авторов, от новых к старым."""
+    keys = {
+        RECENT_KEY.format(author_id): author_id for author_id in author_ids
+    }
+    found = cache.get_many(keys)
+    missing = {}
+    for key, author_id in keys.items():
+        if key not in found:
+            missing[key] = list(
+                Post.objects.filter(author=author_id).order_by(
+                    "-pub_date", "-pk"
+                ).values_list(
+                    "pub_date", "pk"
+                )[:settings.TIMELINE_LENGTH]
+            )
+    cache.set_many(missing, settings.TIMELINE_CACHE_TIMEOUT)
+    found.update(missing)
+    return list(found.values())
+
+
+def forget_post(post):
+    cache.delete(RECENT_KEY.format(post.author_id))
+
+
+def push_post(post):
+    if post.author_id in celebrity_ids():
+        forget_post(post)
+        return
+    followers = Follow.objects.filter(
+        author=post.author_id
+    ).values_list("user_id", flat=True)
+    entries = [
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers
+    ]
+    TimelineEntry.objects.bulk_create(entries, ignore_conflicts=True)
+    if entries:
+        trim_followers(post.author_id)
+
+
+def backfill(user_id, author_id):
+    if author_id not in celebrity_ids():
+        fill(user_id, author_id)
+
+
+def fill(user_id, author_id):
+    posts = Post.objects.filter(
+        author=author_id
+    ).values_list("pk", "pub_date")[:settings.TIMELINE_LENGTH]
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for pk, pub_date in posts
+        ],
+        ignore_conflicts=True
+    )
+    trim(user_id)
+
+
+def purge(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user=user_id, post__author=author_id
+    ).delete()
+
+
+def trim(user_id):
+    stale = TimelineEntry.objects.filter(user=user_id).order_by(
+        "-pub_date", "-post_id"
+    ).values_list("pk", flat=True)[settings.TIMELINE_LENGTH:]
+    stale = list(stale)
+    if stale:
+        TimelineEntry.objects.filter(pk__in=stale).delete()
+
+
+def trim_followers(author_id):
+    """trim() для всех подписчиков автора одним запросом.
+
+    Пост пишется в транзакции new_post: запрос на каждого подписчика
+    держал бы блокировку записи SQLite тысячи запросов.
+    """
+    quote = connection.ops.quote_name
+    timeline = quote(TimelineEntry._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            DELETE FROM {timeline} WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY user_id
+                        ORDER BY pub_date DESC, post_id DESC
+                    ) AS position
+                    FROM {timeline}
+                    WHERE user_id IN (
+                        SELECT user_id FROM {quote(Follow._meta.db_table)}
+                        WHERE author_id = %s
+                    )
+                ) ranked
+                WHERE position > %s
+            )
+        """, [author_id, settings.TIMELINE_LENGTH])
+
+
+class TimelinePaginator(CursorPaginator):
+    """Лента подписок: разосланные записи плюс посты популярных авторов.
+
+    Посты обычных авторов лежат в TimelineEntry читателя, посты авторов
+    из celebrity_ids() берутся из кэша их последних постов. Оба потока
+    уже отсортированы по (pub_date, pk), поэтому страница собирается
+    слиянием без сортировки в базе.
+    """
+
+    def __init__(self, user, per_page):
+        super().__init__(
+            TimelineEntry.objects.filter(user=user), per_page,
+            keys=("pub_date", "post_id")
+        )
+        self.user = user
+
+    @cached_property
+    def pulled(self):
+        celebrities = celebrity_ids()
+        if not celebrities:
+            return []
+        return recent_posts(Follow.objects.filter(
+            user=self.user, author__in=celebrities
+        ).values_list("author_id", flat=True))
+
+    def fetch_older(self, cursor, limit):
+        pushed = older_than(
+            self.object_list, cursor, self.keys
+        ).values_list("pub_date", "post_id")[:limit]
+        pulled = [
+            [key for key in keys if cursor is None or key < cursor][:limit]
+            for keys in self.pulled
+        ]
+        return self.load(heapq.merge(pushed, *pulled, reverse=True), limit)
+
+    def fetch_newer(self, cursor, limit):
+        pushed = newer_than(
+            self.object_list, cursor, self.keys
+        ).values_list("pub_date", "post_id")[:limit]
+        pulled = [
+            [key for key in reversed(keys) if key > cursor][:limit]
+            for keys in self.pulled
+        ]
+        return self.load(heapq.merge(pushed, *pulled), limit)
+
+    def load(self, keys, limit):
+        pks = []
+        for _, pk in keys:
+            if pk not in pks:
+                pks.append(pk)
+            if len(pks) == limit:
+                break
+        posts = self.in_bulk(pks)
+        return [posts[pk] for pk in pks if pk in posts]
+
+    def in_bulk(self, pks):
+        return Post.objects.with_related().in_bulk(pks)
+
+    def cursor_for(self, post):
+        return encode_cursor(post.pub_date, post.pk)
@@ -0,0 +1,161 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import (TemporaryUploadedFile,
+                                            UploadedFile)
+from django.core.files.uploadhandler import FileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+FORMATS = ("JPEG", "PNG", "GIF", "WEBP")
+# Столько байт начала файла ждём, пока Pillow не разберёт заголовок.
+# У JPEG перед размерами может стоять большой блок EXIF
+HEADER_LIMIT = 256 * 1024
+TEMP_DIR = "uploads"
+
+NOT_IMAGE = ("Загрузите правильное изображение. Файл, который вы "
+             "загрузили, поврежден или не является изображением.")
+
+
+def read_header(header):
+    """Формат и размеры по заголовку, без декодирования пикселей.
+
+    None - данных пока не хватает или это не картинка из FORMATS.
+    У Image.open в Pillow 7.0 из requirements.txt нет аргумента
+    formats, поэтому формат проверяется после открытия.
+    """
+    try:
+        with Image.open(io.BytesIO(header)) as image:
+            info = image.format, image.size
+    except OSError:
+        # UnidentifiedImageError: не разобрался ни один модуль Pillow
+        return None
+    return info if info[0] in FORMATS else None
+
+
+class MediaTemporaryUploadedFile(TemporaryUploadedFile):
+    """Временный файл внутри MEDIA_ROOT.
+
+    FileSystemStorage переносит такой файл на место через os.rename,
+    поэтому принятая картинка не копируется второй раз.
+    """
+
+    def __init__(self, name, content_type, size, charset,
+                 content_type_extra=None):
+        directory = os.path.join(settings.MEDIA_ROOT, TEMP_DIR)
+        os.makedirs(directory, exist_ok=True)
+        _, ext = os.path.splitext(name)
+        file = tempfile.NamedTemporaryFile(
+            suffix=".upload" + ext, dir=directory
+        )
+        UploadedFile.__init__(
+            self, file, name, content_type, size, charset,
+            content_type_extra
+        )
+
+
+class RejectedUpload(UploadedFile):
+    """Пустая заглушка вместо отклонённого файла, несёт текст ошибки."""
+
+    def __init__(self, name, error):
+        super().__init__(io.BytesIO(), name, size=0)
+        self.upload_error = error
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Пишет загрузку на диск по мере чтения запроса.
+
+    Попутно считается sha256 для ContentAddressedStorage.
+    Формат и размер в пикселях проверяются по первым чанкам. Если файл
+    слишком велик, не картинка или похож на декомпрессионную бомбу,
+    дальнейшие чанки отбрасываются, а форма получает RejectedUpload.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.error = None
+        self.info = None
+        self.header = b""
+        self.received = 0
+        self.sha256 = hashlib.sha256()
+        self.file = MediaTemporaryUploadedFile(
+            self.file_name, self.content_type, 0, self.charset,
+            self.content_type_extra
+        )
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            return None
+        self.received += len(raw_data)
+        if self.received > settings.POST_IMAGE_MAX_SIZE:
+            self.reject(
+                "Файл больше "
+                f"{filesizeformat(settings.POST_IMAGE_MAX_SIZE)}."
+            )
+            return None
+        if self.info is None:
+            self.inspect(raw_data)
+        if self.error is None:
+            self.sha256.update(raw_data)
+            self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self.error is None and self.info is None:
+            self.reject(NOT_IMAGE)
+        if self.error is not None:
+            return RejectedUpload(self.file_name, self.error)
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.sha256.hexdigest()
+        self.file.image_format, self.file.image_size = self.info
+        return self.file
+
+    def inspect(self, raw_data):
+        self.header += raw_data
+        try:
+            self.info = read_header(self.header)
+        except Image.DecompressionBombError:
+            self.info = None
+            self.reject("Слишком большое изображение.")
+            return
+        if self.info is not None:
+            self.header = b""
+            width, height = self.info[1]
+            if width * height > settings.POST_IMAGE_MAX_PIXELS:
+                self.reject(
+                    f"Изображение {width}x{height} слишком большое."
+                )
+        elif len(self.header) >= HEADER_LIMIT:
+            self.reject(NOT_IMAGE)
+
+    def reject(self, error):
+        self.error = error
+        self.header = b""
+        self.file.close()
+
+
+class RejectedUploadsMixin:
+    """Превращает RejectedUpload в ошибку соответствующего поля формы."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.upload_errors = {
+            name: upload.upload_error
+            for name, upload in self.files.items()
+            if isinstance(upload, RejectedUpload)
+        }
+        if self.upload_errors:
+            self.files = self.files.copy()
+            for name in self.upload_errors:
+                del self.files[name]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for name, error in self.upload_errors.items():
+            self.add_error(name, ValidationError(error, code="invalid_image"))
+        return cleaned_data
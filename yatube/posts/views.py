@@ -1,38 +1,88 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.db import transaction
 from django.shortcuts import get_object_or_404, redirect, render
 
+from . import caching, concurrency, follows, ratelimit, stats, timeline
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
+from .models import Comment, Group, Post, User
+from .paginator import CursorPaginator
+from .search import SearchPaginator
 
 POSTS_ON_PAGE = 10
 
 
+def get_page(request, paginator):
+    return paginator.get_page(
+        after=request.GET.get("after"), before=request.GET.get("before")
+    )
+
+
+def feed_keys(request, *args, **kwargs):
+    return [caching.FEED]
+
+
+def profile_keys(request, username):
+    author_id = User.objects.filter(
+        username=username
+    ).values_list("pk", flat=True).first()
+    return author_id and [f"author-{author_id}"]
+
+
+def post_keys(request, username, post_id):
+    author_id = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).order_by().values_list("author_id", flat=True).first()
+    return author_id and [f"post-{post_id}", f"author-{author_id}"]
+
+
+def follow_keys(request):
+    return [caching.FEED, f"author-{request.user.pk}"]
+
+
+@caching.conditional(feed_keys)
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_num = request.GET.get("page")
-    page = paginator.get_page(page_num)
-    return render(
+    posts = Post.objects.with_related()
+    page = get_page(request, CursorPaginator(posts, POSTS_ON_PAGE))
+    response = render(
         request, "posts/index.html",
-        {"page": page}
+        {"page": page, "feed_generation": caching.feed_generation(),
+         "cache_timeout": settings.INDEX_CACHE_TIMEOUT}
+    )
+    return caching.add_surrogate_keys(
+        response, caching.FEED, *caching.page_keys(page)
     )
 
 
+@caching.conditional(feed_keys)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_num = request.GET.get("page")
-    page = paginator.get_page(page_num)
-    return render(
+    posts = group.posts.with_related()
+    page = get_page(request, CursorPaginator(posts, POSTS_ON_PAGE))
+    response = render(
         request,
         "group.html",
         {"group": group, "page": page}
     )
+    return caching.add_surrogate_keys(
+        response, f"group-{group.pk}", *caching.page_keys(page)
+    )
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page = None
+    if query:
+        page = get_page(request, SearchPaginator(query, POSTS_ON_PAGE))
+    return render(
+        request, "posts/search.html",
+        {"page": page, "query": query}
+    )
 
 
 @login_required
+@ratelimit.limit("new_post", "write_ip", methods=("POST",))
+@transaction.atomic
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -47,25 +97,28 @@ def new_post(request):
     )
 
 
+@caching.conditional(profile_keys)
 def profile(request, username):
-    user = get_object_or_404(User, username=username)
-    posts = user.posts.all()
-    num = posts.count()
-    followers = user.following.count()
-    follows = user.follower.count()
-    following = (request.user.is_authenticated
-                 and Follow.objects.filter(author=user,
-                                           user=request.user).exists())
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_num = request.GET.get("page")
-    page = paginator.get_page(page_num)
-    return render(
+    user = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = user.posts.with_related()
+    user_stats = follows.with_pending(stats.get_stats(user), request.user)
+    page, following = concurrency.gather(
+        lambda: get_page(request, CursorPaginator(posts, POSTS_ON_PAGE)),
+        lambda: follows.is_following(request.user, user),
+    )
+    response = render(
         request, "posts/profile.html", context={
-            "author": user, "num_of_posts": num,
+            "author": user, "num_of_posts": user_stats.posts_count,
             "page": page, "following": following,
-            "followers": followers, "follows": follows
+            "followers": user_stats.followers_count,
+            "follows": user_stats.follows_count
         }
     )
+    return caching.add_surrogate_keys(
+        response, f"author-{user.pk}", *caching.page_keys(page)
+    )
 
 
 @login_required
@@ -88,6 +141,7 @@ def post_edit(request, username, post_id):
 
 
 @login_required
+@ratelimit.limit("add_comment", "write_ip", methods=("POST",))
 def add_comment(request, username, post_id):
     post = get_object_or_404(Post, pk=post_id, author__username=username)
     form = CommentForm(request.POST or None)
@@ -99,28 +153,42 @@ def add_comment(request, username, post_id):
     return redirect("posts:post_view", post_id=post_id, username=username)
 
 
+@caching.conditional(post_keys)
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, pk=post_id, author__username=username)
-    num = post.author.posts.count()
-    followers = post.author.following.count()
-    follows = post.author.follower.count()
-    comments = post.comments.all()
+    # Комментарии не ждут поста: для чужого username их просто не покажут.
+    # len() загружает queryset, шаблон получит готовый результат
+    comments = Comment.objects.filter(post=post_id).select_related("author")
+    post, _ = concurrency.gather(
+        lambda: get_object_or_404(
+            Post.objects.with_related().select_related("author__stats"),
+            pk=post_id, author__username=username
+        ),
+        lambda: len(comments),
+    )
+    user_stats = follows.with_pending(
+        stats.get_stats(post.author), request.user
+    )
     form = CommentForm(request.POST or None)
-    return render(
+    response = render(
         request, "posts/post.html", context={
-            "author": post.author, "num_of_posts": num,
+            "author": post.author, "num_of_posts": user_stats.posts_count,
             "post": post, "comments": comments, 'form': form, "on_post": True,
-            "followers": followers, "follows": follows
+            "followers": user_stats.followers_count,
+            "follows": user_stats.follows_count
         }
     )
+    return caching.add_surrogate_keys(
+        response, f"author-{post.author_id}", *caching.page_keys([post])
+    )
 
 
 @login_required
+@caching.conditional(follow_keys)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, POSTS_ON_PAGE)
-    page_num = request.GET.get("page")
-    page = paginator.get_page(page_num)
+    # Ленту строят записанные подписки: свои отложенные пишутся сейчас
+    follows.flush(request.user.pk)
+    paginator = timeline.TimelinePaginator(request.user, POSTS_ON_PAGE)
+    page = get_page(request, paginator)
     return render(
         request,
         "posts/follow.html", {"page": page}
@@ -128,21 +196,20 @@ def follow_index(request):
 
 
 @login_required
+@ratelimit.limit("follow", "write_ip")
 def profile_follow(request, username):
     follow_author = get_object_or_404(User, username=username)
     if request.user != follow_author:
-        Follow.objects.get_or_create(author=follow_author, user=request.user)
+        follows.change(request.user.pk, follow_author.pk, True)
     return redirect("posts:profile", username=username)
 
 
 @login_required
+@ratelimit.limit("follow", "write_ip")
 def profile_unfollow(request, username):
     unfollow_author = get_object_or_404(User, username=username)
     if request.user != unfollow_author:
-        unfollow = Follow.objects.filter(
-            user=request.user, author=unfollow_author
-        )
-        unfollow.delete()
+        follows.change(request.user.pk, unfollow_author.pk, False)
     return redirect("posts:profile", username=username)
 
 
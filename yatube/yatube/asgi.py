@@ -0,0 +1,138 @@
+import asyncio
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+# Тело запроса больше этого уходит из памяти во временный файл
+SPOOL_SIZE = 1024 * 1024
+
+
+def build_environ(scope, body):
+    """WSGI environ для HTTP scope ASGI; body - файл с телом запроса."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        # WSGI передаёт путь байтами, декодированными как latin-1
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin-1").upper().replace("-", "_")
+        if name not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            name = f"HTTP_{name}"
+        value = value.decode("latin-1")
+        if name in environ:
+            value = f"{environ[name]},{value}"
+        environ[name] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-обработчика Django.
+
+    Django 2.2 не умеет ни ASGI, ни асинхронных представлений,
+    поэтому представления работают как прежде, но в пуле из threads
+    потоков, а медленные клиенты, keep-alive и чтение тела запроса
+    обслуживает цикл событий ASGI-сервера и потоков не занимают.
+    Ответ отправляется по мере итерации, так что StreamingHttpResponse
+    не собирается в памяти.
+    """
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix="asgi"
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Неподдерживаемый тип {scope['type']}")
+        body = tempfile.SpooledTemporaryFile(SPOOL_SIZE)
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                if not message.get("more_body"):
+                    break
+            body.seek(0)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                self.executor, self.handle, loop, build_environ(scope, body),
+                send
+            )
+        finally:
+            body.close()
+
+    def handle(self, loop, environ, send):
+        """Весь WSGI-вызов в одном потоке: close() закрывает его соединения."""
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response["status"] = int(status.split(" ", 1)[0])
+            response["headers"] = [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in headers
+            ]
+
+        def start():
+            send_message({"type": "http.response.start", **response})
+
+        iterable = self.wsgi_application(environ, start_response)
+        try:
+            started = False
+            for chunk in iterable:
+                if not started:
+                    start()
+                    started = True
+                if chunk:
+                    send_message({
+                        "type": "http.response.body", "body": chunk,
+                        "more_body": True,
+                    })
+            if not started:
+                start()
+            send_message({"type": "http.response.body", "body": b""})
+        finally:
+            close = getattr(iterable, "close", None)
+            if close is not None:
+                close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.executor.shutdown(wait=True)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+application = WsgiToAsgi(get_wsgi_application(), settings.ASGI_THREADS)
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'about',
     'users',
     'posts',
+    'api',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'posts.middleware.ReplicaPinMiddleware',
+    'posts.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -47,6 +50,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.AnonymousCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -54,7 +58,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'posts.metrics.TimedTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -79,9 +83,39 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, а не открывается заново
+        'CONN_MAX_AGE': 60,
+        # Сколько секунд ждать снятия блокировки записи (busy timeout)
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# Реплики только для чтения. Локально реплика - второй файл SQLite,
+# который догоняет основную базу командой sync_replica:
+#   YATUBE_REPLICA_DB=replica.sqlite3 python manage.py sync_replica
+DATABASE_REPLICAS = []
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['posts.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи клиент читает из основной базы
+REPLICA_PIN_SECONDS = 10
+
+# Выполняются для каждого нового соединения с SQLite (posts.signals).
+# WAL даёт читать параллельно с записью, synchronous=NORMAL в режиме
+# WAL не теряет целостность и не делает fsync на каждый коммит
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'memory',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -101,11 +135,28 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# posts.metrics.CountingCache считает попадания и промахи для /metrics
+# и оборачивает бэкенд, заданный в OPTIONS.
+# Версии суррогатных ключей, поколение ленты, кэш страниц и счётчики
+# ограничений частоты должны быть общими для всех процессов сайта.
+# У LocMemCache в каждом процессе свой кэш: процесс не узнает о записи
+# в другом и отдаёт старое, пока не истечёт срок. Поэтому без общего
+# кэша (YATUBE_MEMCACHED - адрес memcached, нужен python-memcached)
+# сроки ниже короткие, и LocMemCache годится для одного процесса
+CACHE_SHARED = bool(os.environ.get('YATUBE_MEMCACHED'))
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'posts.metrics.CountingCache',
+        'OPTIONS': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
     }
 }
+if CACHE_SHARED:
+    CACHES['default']['OPTIONS'] = {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ['YATUBE_MEMCACHED'],
+    }
 
 
 # Internationalization
@@ -134,3 +185,72 @@ STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+
+
+# Длина материализованной ленты подписок на одного пользователя
+TIMELINE_LENGTH = 800
+# Посты авторов с таким числом подписчиков не рассылаются по лентам,
+# а подмешиваются при чтении из кэша последних постов автора
+TIMELINE_CELEBRITY_FOLLOWERS = 10000
+TIMELINE_CACHE_TIMEOUT = 600
+
+# Фрагмент ленты на главной инвалидируется поколением ленты,
+# поэтому с общим кэшем (CACHE_SHARED) TTL может быть большим
+INDEX_CACHE_TIMEOUT = 60 * 60 * 6 if CACHE_SHARED else 60
+
+# Кэш страниц для анонимных посетителей: сколько хранить у себя
+# и сколько разрешать держать промежуточным прокси
+ANONYMOUS_CACHE_TIMEOUT = 60 * 60 if CACHE_SHARED else 60
+ANONYMOUS_CACHE_MAX_AGE = 60
+
+# Сколько живут версии суррогатных ключей, от которых зависят ETag и
+# кэш страниц; None - пока их не вытеснят. Без общего кэша версия
+# процесса, не видевшего записи, устаревает не позже этого срока
+SURROGATE_KEY_TIMEOUT = None if CACHE_SHARED else 60
+
+# Миниатюры и варианты картинок создаются фоновым потоком после
+# сохранения поста. True - выполнять задачи сразу (тесты, скрипты)
+BACKGROUND_TASKS_EAGER = False
+
+# Загрузки картинок проверяются по заголовку прямо во время чтения
+# запроса и пишутся во временный файл внутри MEDIA_ROOT
+FILE_UPLOAD_HANDLERS = ["posts.uploads.ImageUploadHandler"]
+POST_IMAGE_MAX_SIZE = 10 * 1024 * 1024
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+
+# Импорт через API (POST /api/v1/import/) скачивает картинки по
+# http(s) только с этих хостов. Команда import_posts - с любых
+IMPORT_IMAGE_HOSTS = []
+IMPORT_IMAGE_TIMEOUT = 10
+
+# Подписки и отписки копятся в памяти и пишутся одной транзакцией
+# не чаще раза в столько миллисекунд (posts.follows); 0 - сразу.
+# Буфер включается явно: пока он не записан, новую подписку видит
+# только сам подписчик, а не другие читатели базы и не другие
+# процессы. Имеет смысл там, где шторм переключений бьёт в запись
+FOLLOW_FLUSH_MS = int(os.environ.get('YATUBE_FOLLOW_FLUSH_MS', 0))
+
+# Ограничения частоты запросов на запись (posts.ratelimit):
+# правило -> (алгоритм, запросов, за секунд, ключ: user или ip).
+# Анонимов правила по user считают по адресу
+RATE_LIMITS = {
+    "new_post": ("token_bucket", 20, 60, "user"),
+    "add_comment": ("token_bucket", 30, 60, "user"),
+    "follow": ("sliding_window", 60, 60, "user"),
+    "signup": ("sliding_window", 10, 60 * 60, "ip"),
+    # Общий потолок записи с одного адреса за все учётные записи
+    "write_ip": ("sliding_window", 300, 60, "ip"),
+}
+# Адреса и сети обратных прокси перед сайтом (posts.clients). Только
+# от них принимается X-Forwarded-For, иначе клиент мог бы подставить
+# в заголовок любой адрес, обойти ограничения по ip и попасть в
+# /metrics/ как адрес из INTERNAL_IPS
+TRUSTED_PROXIES = []
+
+# Потоки для независимых запросов одной страницы (posts.concurrency)
+# и для обработки запросов под ASGI (yatube.asgi)
+QUERY_WORKERS = 4
+ASGI_THREADS = 16
+
+# Адреса, с которых Prometheus может читать /metrics
+INTERNAL_IPS = ["127.0.0.1"]
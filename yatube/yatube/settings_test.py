@@ -0,0 +1,21 @@
+# Тихий детерминированный прогон тестов: pytest берёт их из pytest.ini,
+# manage.py test - с --settings=yatube.settings_test. Без этого ключа
+# тесты идут на боевых настройках и тоже должны проходить.
+#
+# Тестовая база - SQLite в памяти, общая для соединений всех потоков
+# и блокируемая целыми таблицами. Фоновые потоки (задачи, таймер
+# подписок, QUERY_WORKERS) упираются в открытую транзакцию теста и
+# сыплют в лог "database table is locked", а их запись может попасть
+# в очистку базы между тестами. Поэтому здесь всё идёт в потоке
+# запроса; сами потоки проверяют тесты с override_settings
+# (posts/tests/test_tasks.py, test_follows.py, test_concurrency.py)
+from .settings import *  # noqa: F401,F403
+
+# Фоновые задачи выполняются сразу в вызывающем потоке
+BACKGROUND_TASKS_EAGER = True
+
+# Запросы представлений идут по очереди в том же соединении
+QUERY_WORKERS = 1
+
+# Подписки пишутся в базу сразу, даже если буфер включён окружением
+FOLLOW_FLUSH_MS = 0